@@ -0,0 +1,270 @@
+"""
+Control de admisión y descarte de carga
+Limita las peticiones concurrentes, en total y por ruta, con una cola de espera acotada.
+Lo que no cabe recibe un 503 inmediato con Retry-After, y las lecturas pasan antes
+que las escrituras administrativas como POST /menu/seed
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .database import DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE
+from .metrics import Counter, Gauge, Histogram, registry
+
+
+def default_max_concurrent(url: str) -> int:
+    """Más peticiones a la vez que conexiones solo alarga la espera por el pool"""
+    if url.startswith("sqlite"):
+        # StaticPool: una única conexión que no admite uso concurrente
+        return 1
+    return DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENT = int(
+    os.getenv("ADMISSION_MAX_CONCURRENT") or default_max_concurrent(DATABASE_URL)
+)
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+ADMISSION_ROUTE_LIMITS = os.getenv(
+    "ADMISSION_ROUTE_LIMITS", "POST /menu/seed=1,POST /menu/bulk=2"
+)
+
+# Prioridades: menor número se atiende antes
+READ, WRITE, ADMIN = 0, 1, 2
+PRIORITY_NAMES = {READ: "read", WRITE: "write", ADMIN: "admin"}
+
+READ_ONLY_POSTS = {"/menu/lookup", "/menu/quote"}
+ADMIN_ROUTES = {"POST /menu/seed", "POST /menu/bulk"}
+# Salud, observabilidad y streams de larga duración no ocupan cupo
+EXEMPT_ROUTES = {"/", "/menu/stream"}
+EXEMPT_PREFIXES = ("/metrics", "/debug")
+
+ADMISSION_WAIT = registry.register(Histogram(
+    "http_admission_wait_seconds", "Espera en la cola de admisión", ("route",)
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "http_admission_rejected_total", "Peticiones descartadas por sobrecarga", ("route", "reason")
+))
+ADMISSION_QUEUE_DEPTH = registry.register(Gauge(
+    "http_admission_queue_depth", "Peticiones esperando turno"
+))
+
+
+def parse_route_limits(spec: str) -> Dict[str, int]:
+    """Límites por ruta a partir de 'POST /menu/seed=1,POST /menu/bulk=2'"""
+    limits: Dict[str, int] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        route, _, limit = part.rpartition("=")
+        limits[" ".join(route.split())] = int(limit)
+    return limits
+
+
+def route_priority(method: str, path: str) -> int:
+    """Prioridad de una ruta; las variantes /async comparten la de su ruta sync"""
+    if path.startswith("/async/"):
+        path = path[len("/async"):]
+    if f"{method} {path}" in ADMIN_ROUTES:
+        return ADMIN
+    if method in ("GET", "HEAD") or path in READ_ONLY_POSTS:
+        return READ
+    return WRITE
+
+
+def is_exempt(path: str) -> bool:
+    return path in EXEMPT_ROUTES or path.startswith(EXEMPT_PREFIXES)
+
+
+class _Waiter:
+    __slots__ = ("key", "priority", "seq", "future")
+
+    def __init__(self, key: str, priority: int, seq: int, future: "asyncio.Future[bool]") -> None:
+        self.key = key
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+
+    def order(self) -> Tuple[int, int]:
+        return (self.priority, self.seq)
+
+
+class AdmissionController:
+    """Cupos de concurrencia con cola priorizada; vive en el event loop, sin locks"""
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        route_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.route_limits = (
+            parse_route_limits(ADMISSION_ROUTE_LIMITS) if route_limits is None else route_limits
+        )
+        self._active = 0
+        self._route_active: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "timeout": 0, "shed": 0}
+
+    def _has_capacity(self, key: str) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        limit = self.route_limits.get(key)
+        return limit is None or self._route_active.get(key, 0) < limit
+
+    def _grant(self, key: str) -> None:
+        self._active += 1
+        self._route_active[key] = self._route_active.get(key, 0) + 1
+        self.admitted += 1
+
+    def _dequeue(self, waiter: _Waiter, admitted: bool) -> None:
+        self._waiters.remove(waiter)
+        ADMISSION_QUEUE_DEPTH.dec()
+        if admitted:
+            self._grant(waiter.key)
+        waiter.future.set_result(admitted)
+
+    def _dispatch(self) -> None:
+        # Un cupo libre pasa a la espera de mayor prioridad que quepa en su ruta
+        while self._waiters and self._active < self.max_concurrent:
+            eligible = [w for w in self._waiters if self._has_capacity(w.key)]
+            if not eligible:
+                return
+            self._dequeue(min(eligible, key=_Waiter.order), admitted=True)
+
+    async def acquire(self, key: str, priority: int = READ) -> Optional[str]:
+        """None si la petición puede pasar; si no, el motivo del descarte"""
+        if self._has_capacity(key):
+            self._grant(key)
+            return None
+
+        if len(self._waiters) >= self.queue_size:
+            worst = max(self._waiters, key=_Waiter.order, default=None)
+            if worst is None or worst.priority <= priority:
+                return self._reject("queue_full")
+            # Una lectura desplaza de la cola a la escritura menos prioritaria
+            self._dequeue(worst, admitted=False)
+
+        waiter = _Waiter(key, priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.future.done():
+            self._dequeue(waiter, admitted=False)
+            return self._reject("timeout")
+        return None if waiter.future.result() else self._reject("shed")
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] += 1
+        return reason
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """El cliente se fue mientras esperaba: libera la cola o el cupo ya concedido"""
+        if not waiter.future.done():
+            self._dequeue(waiter, admitted=False)
+        elif waiter.future.result():
+            self.release(waiter.key)
+
+    def release(self, key: str) -> None:
+        self._active -= 1
+        self._route_active[key] -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "route_limits": dict(self.route_limits),
+            "active": self._active,
+            "active_by_route": {k: v for k, v in self._route_active.items() if v},
+            "waiting": len(self._waiters),
+            "waiting_by_priority": {
+                name: sum(1 for w in self._waiters if w.priority == priority)
+                for priority, name in PRIORITY_NAMES.items()
+            },
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+        }
+
+
+admission = AdmissionController()
+
+
+def match_route(scope: Scope) -> Optional[APIRoute]:
+    """Ruta que atenderá la petición; el router aún no la ha puesto en el scope"""
+    app = scope.get("app")
+    if app is None:
+        return None
+    for route in app.router.routes:
+        if isinstance(route, APIRoute) and route.matches(scope)[0] == Match.FULL:
+            return route
+    return None
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI puro que pide cupo antes de llegar al threadpool y a la base"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController = admission,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = match_route(scope) if scope["type"] == "http" else None
+        if route is None or is_exempt(route.path):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        key = f"{method} {route.path}"
+        start = time.perf_counter()
+        reason = await self.controller.acquire(key, route_priority(method, route.path))
+        waited = time.perf_counter() - start
+        if reason is not None:
+            ADMISSION_REJECTED.inc((route.path, reason))
+            # Las métricas etiquetan por plantilla aunque el router no llegue a correr
+            scope["route"] = route
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Servicio saturado, reintente en unos segundos"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_WAIT.observe(waited, (route.path,))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(key)
@@ -0,0 +1,148 @@
+"""
+Variantes asíncronas de las rutas del menú (AsyncSession)
+Se montan bajo /async cuando DB_MODE=async para comparar el acceso a la base con las
+síncronas; cubren solo GET /menu (con ETag y 304), GET /menu/{name},
+GET /menu/{name}/{size}, POST /menu/lookup, POST /menu y DELETE /menu/{bebida_id}
+Paginación, NDJSON, búsqueda, cotización, lotes, upsert, seed, la caché de
+búsquedas por nombre y los validadores de las búsquedas quedan solo en las síncronas
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from .cache import menu_cache
+from .conditional import is_not_modified, not_modified
+from .database import get_async_db
+from .events import amenu_changed
+from .profiling import ProfiledRoute
+from .models import (
+    AsyncBebidaRepository,
+    Bebida,
+    BebidaCreate,
+    BebidaLookupRequest,
+    BebidaLookupResponse,
+)
+
+router = APIRouter(prefix="/async", tags=["async"], route_class=ProfiledRoute)
+
+
+@router.get("/menu", response_model=List[Bebida])
+async def get_menu(request: Request, db: AsyncSession = Depends(get_async_db)) -> Response:
+    """Obtiene el menú completo de bebidas"""
+    try:
+        snapshot = await menu_cache.aget(
+            lambda: AsyncBebidaRepository.get_all(db),
+            lambda: AsyncBebidaRepository.current_version(db),
+            lambda: AsyncBebidaRepository.last_changed_at(db),
+        )
+        if is_not_modified(request, snapshot.etag, snapshot.last_modified):
+            return not_modified(snapshot.etag, snapshot.last_modified)
+        return snapshot.to_response(request.headers.get("accept-encoding", ""))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener el menú: {str(e)}"
+        )
+
+
+@router.get("/menu/{name}", response_model=Bebida)
+async def get_bebida_by_name(name: str, db: AsyncSession = Depends(get_async_db)) -> Bebida:
+    """Busca una bebida por nombre"""
+    try:
+        bebida_db = await AsyncBebidaRepository.get_by_name(db, name)
+        if not bebida_db:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Bebida '{name}' no encontrada en el menú"
+            )
+        return Bebida.model_validate(bebida_db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar bebida: {str(e)}"
+        )
+
+
+@router.get("/menu/{name}/{size}", response_model=Bebida)
+async def get_bebida_by_name_and_size(
+    name: str, size: str, db: AsyncSession = Depends(get_async_db)
+) -> Bebida:
+    """Busca una bebida por nombre y tamaño exactos"""
+    try:
+        bebida_db = await AsyncBebidaRepository.get_by_name_and_size(db, name, size)
+        if not bebida_db:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Bebida '{name}' no disponible en tamaño '{size}'"
+            )
+        return Bebida.model_validate(bebida_db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar bebida: {str(e)}"
+        )
+
+
+@router.post("/menu/lookup", response_model=BebidaLookupResponse)
+async def lookup_bebidas(
+    lookup: BebidaLookupRequest, db: AsyncSession = Depends(get_async_db)
+) -> BebidaLookupResponse:
+    """Resuelve varias bebidas por nombre y tamaño en una sola consulta"""
+    try:
+        pairs = [(item.name, item.size) for item in lookup.items]
+        bebidas_db = await AsyncBebidaRepository.get_many_by_name_and_size(db, pairs)
+        return BebidaLookupResponse.from_matches(lookup.items, bebidas_db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al resolver bebidas: {str(e)}"
+        )
+
+
+@router.post("/menu", response_model=Bebida, status_code=status.HTTP_201_CREATED)
+async def create_bebida(
+    bebida: BebidaCreate, db: AsyncSession = Depends(get_async_db)
+) -> Bebida:
+    """Crea una nueva bebida en el menú"""
+    try:
+        nueva_bebida_db = await AsyncBebidaRepository.create(db, bebida)
+        if nueva_bebida_db is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ya existe una bebida '{bebida.name}' con tamaño '{bebida.size}'"
+            )
+        nueva_bebida = Bebida.model_validate(nueva_bebida_db)
+        await amenu_changed(db)
+        return nueva_bebida
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear bebida: {str(e)}"
+        )
+
+
+@router.delete("/menu/{bebida_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_bebida(bebida_id: int, db: AsyncSession = Depends(get_async_db)) -> None:
+    """Elimina una bebida del menú"""
+    try:
+        if not await AsyncBebidaRepository.delete_by_id(db, bebida_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Bebida con ID {bebida_id} no encontrada"
+            )
+        await amenu_changed(db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al eliminar bebida: {str(e)}"
+        )
@@ -0,0 +1,316 @@
+"""
+Caché en proceso del menú de bebidas
+El menú se guarda ya codificado en JSON (y comprimido) para servirlo sin
+volver a serializarlo en cada request
+"""
+import asyncio
+import gzip
+import json
+import threading
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import anyio
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from .conditional import as_utc, make_etag, validator_headers
+from .models import Bebida, BebidaDB, BebidaRepository
+from .shared import MENU_SHM_PATH, SharedEntry, SharedMenuSnapshot
+from .singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional
+    brotli = None
+
+MenuPayload = List[Dict[str, Any]]
+MenuRows = Sequence[BebidaDB]
+VersionLoader = Callable[[], int]
+ModifiedLoader = Callable[[], Optional[datetime]]
+
+# La compresión se paga una vez por versión del menú, no por request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Codificaciones aceptadas por el cliente con su peso q"""
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    return accepted
+
+
+class MenuSnapshot:
+    """Menú serializado una sola vez, con sus variantes gzip y brotli"""
+
+    def __init__(self, rows: MenuPayload, last_modified: Optional[datetime] = None) -> None:
+        self._rows: Optional[MenuPayload] = rows
+        self.last_modified = last_modified
+        self.body = json.dumps(
+            rows, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = make_etag(self.body)
+        self.encoded: Dict[str, bytes] = {}
+        compressed = gzip.compress(self.body, compresslevel=GZIP_LEVEL)
+        if len(compressed) < len(self.body):
+            self.encoded["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            if len(compressed) < len(self.body):
+                self.encoded["br"] = compressed
+
+    @classmethod
+    def from_bebidas(
+        cls, bebidas: MenuRows, changed_at: Optional[datetime] = None
+    ) -> "MenuSnapshot":
+        """Serializa las filas; Last-Modified es el updated_at más reciente"""
+        # Un borrado no deja updated_at: changed_at es el último cambio del registro
+        modified = [as_utc(b.updated_at) for b in bebidas if b.updated_at is not None]
+        if changed_at is not None:
+            modified.append(as_utc(changed_at))
+        return cls(
+            [Bebida.model_validate(bebida).model_dump() for bebida in bebidas],
+            max(modified) if modified else None
+        )
+
+    @classmethod
+    def from_shared(cls, entry: SharedEntry) -> "MenuSnapshot":
+        """Reutiliza los bytes ya codificados por otro worker, sin recomprimir"""
+        snapshot = cls.__new__(cls)
+        snapshot._rows = None
+        snapshot.last_modified = entry.last_modified
+        snapshot.body = entry.body
+        snapshot.etag = entry.etag
+        snapshot.encoded = entry.encoded
+        return snapshot
+
+    @property
+    def rows(self) -> MenuPayload:
+        """Filas del menú; una copia compartida solo las decodifica si se piden"""
+        if self._rows is None:
+            self._rows = json.loads(self.body)
+        return self._rows
+
+    def negotiate(self, accept_encoding: str) -> Tuple[Optional[str], bytes]:
+        """Elige la variante más pequeña que el cliente acepta"""
+        accepted = parse_accept_encoding(accept_encoding)
+        candidates = [
+            (len(body), encoding, body)
+            for encoding, body in self.encoded.items()
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0
+        ]
+        if not candidates:
+            return None, self.body
+        _, encoding, body = min(candidates)
+        return encoding, body
+
+    def to_response(self, accept_encoding: str = "") -> Response:
+        """Respuesta con los bytes ya codificados, sin pasar por el encoder de FastAPI"""
+        encoding, body = self.negotiate(accept_encoding)
+        headers = {"Vary": "Accept-Encoding", **validator_headers(self.etag, self.last_modified)}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+class MenuCache:
+    """Caché versionada del menú serializado con invalidación por escritura"""
+
+    def __init__(self, shared: Optional[SharedMenuSnapshot] = None) -> None:
+        self._lock = threading.Lock()
+        self.shared = shared
+        self._version = 0
+        self._snapshot: Optional[MenuSnapshot] = None
+        # Un fallo de caché reconstruye el menú una sola vez por versión: quien llega
+        # mientras tanto espera ese snapshot en lugar de repetir la consulta
+        self._flights = SingleFlight()
+        self._pending: Dict[
+            Tuple[asyncio.AbstractEventLoop, int], "asyncio.Task[MenuSnapshot]"
+        ] = {}
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def version(self) -> int:
+        """Versión actual del menú (crece con cada escritura)"""
+        return self._version
+
+    def get(
+        self,
+        loader: Callable[[], MenuRows],
+        version_loader: Optional[VersionLoader] = None,
+        modified_loader: Optional[ModifiedLoader] = None,
+    ) -> MenuSnapshot:
+        """Devuelve el menú en caché o lo reconstruye con las filas del loader
+
+        modified_loader da la fecha del último cambio en la base, así Last-Modified
+        cuenta los borrados y es el mismo en todos los workers
+
+        Con memoria compartida, version_loader (la versión del registro de cambios)
+        decide si sirve la copia del host; solo un worker por host consulta y comprime
+        el menú, aunque cada worker guarda su propia copia de los bytes
+        """
+        snapshot, version = self._lookup()
+        if snapshot is not None:
+            return snapshot
+        snapshot, _ = self._flights.do(
+            version, lambda: self._build(version, loader, version_loader, modified_loader)
+        )
+        return snapshot
+
+    def _build(
+        self,
+        version: int,
+        loader: Callable[[], MenuRows],
+        version_loader: Optional[VersionLoader],
+        modified_loader: Optional[ModifiedLoader],
+    ) -> MenuSnapshot:
+        if self.shared is not None and version_loader is not None:
+            db_version = version_loader()
+            snapshot = self._from_shared(db_version)
+            if snapshot is None:
+                with self.shared.lock():
+                    snapshot = self._from_shared(db_version)
+                    if snapshot is None:
+                        snapshot = MenuSnapshot.from_bebidas(
+                            loader(), modified_loader() if modified_loader else None
+                        )
+                        self._publish(snapshot, db_version)
+        else:
+            snapshot = MenuSnapshot.from_bebidas(
+                loader(), modified_loader() if modified_loader else None
+            )
+        self._store(snapshot, version)
+        return snapshot
+
+    async def aget(
+        self,
+        loader: Callable[[], Awaitable[MenuRows]],
+        version_loader: Optional[Callable[[], Awaitable[int]]] = None,
+        modified_loader: Optional[Callable[[], Awaitable[Optional[datetime]]]] = None,
+    ) -> MenuSnapshot:
+        """Variante asíncrona de get para las rutas con AsyncSession
+
+        El flock, el mmap y la serialización del menú bloquean, así que corren en un hilo
+        """
+        snapshot, version = self._lookup()
+        if snapshot is not None:
+            return snapshot
+        key = (asyncio.get_running_loop(), version)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._abuild(version, loader, version_loader, modified_loader)
+            )
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # shield: si se cancela un request, los demás siguen esperando el mismo snapshot
+        return await asyncio.shield(task)
+
+    async def _abuild(
+        self,
+        version: int,
+        loader: Callable[[], Awaitable[MenuRows]],
+        version_loader: Optional[Callable[[], Awaitable[int]]],
+        modified_loader: Optional[Callable[[], Awaitable[Optional[datetime]]]],
+    ) -> MenuSnapshot:
+        if self.shared is not None and version_loader is not None:
+            db_version = await version_loader()
+            snapshot = await anyio.to_thread.run_sync(self._from_shared, db_version)
+            if snapshot is None:
+                rows = await loader()
+                changed_at = await modified_loader() if modified_loader else None
+                snapshot = await anyio.to_thread.run_sync(
+                    self._publish_rows, rows, db_version, changed_at
+                )
+        else:
+            rows = await loader()
+            changed_at = await modified_loader() if modified_loader else None
+            # Serializar y comprimir el menú bloquea: no se hace en el event loop
+            snapshot = await anyio.to_thread.run_sync(MenuSnapshot.from_bebidas, rows, changed_at)
+        self._store(snapshot, version)
+        return snapshot
+
+    def _publish_rows(
+        self, rows: MenuRows, db_version: int, changed_at: Optional[datetime]
+    ) -> MenuSnapshot:
+        """Publica las filas salvo que otro worker ya haya escrito esa versión"""
+        with self.shared.lock():  # type: ignore[union-attr]
+            snapshot = self._from_shared(db_version)
+            if snapshot is None:
+                snapshot = MenuSnapshot.from_bebidas(rows, changed_at)
+                self._publish(snapshot, db_version)
+        return snapshot
+
+    def _from_shared(self, db_version: int) -> Optional[MenuSnapshot]:
+        entry = self.shared.read(db_version)  # type: ignore[union-attr]
+        return MenuSnapshot.from_shared(entry) if entry is not None else None
+
+    def _publish(self, snapshot: MenuSnapshot, db_version: int) -> None:
+        self.shared.write(  # type: ignore[union-attr]
+            db_version, snapshot.etag, snapshot.last_modified, snapshot.body, snapshot.encoded
+        )
+
+    def _lookup(self) -> Tuple[Optional[MenuSnapshot], int]:
+        with self._lock:
+            if self._snapshot is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return self._snapshot, self._version
+
+    def _store(self, snapshot: MenuSnapshot, version: int) -> None:
+        with self._lock:
+            # Si hubo una escritura mientras se cargaba, no se guarda el menú viejo
+            if self._version == version:
+                self._snapshot = snapshot
+
+    def invalidate(self) -> int:
+        """Descarta el menú en caché y avanza la versión"""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+            return self._version
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            total = self._hits + self._misses
+            snapshot = self._snapshot
+            return {
+                "version": self._version,
+                "cached": snapshot is not None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 4) if total else 0.0,
+                "bytes": {
+                    "identity": len(snapshot.body),
+                    **{enc: len(body) for enc, body in snapshot.encoded.items()},
+                } if snapshot is not None else {},
+                "rebuilds": self._flights.stats(),
+                "shared": self.shared.stats() if self.shared is not None else None,
+            }
+
+
+menu_cache = MenuCache(SharedMenuSnapshot(MENU_SHM_PATH) if MENU_SHM_PATH else None)
+
+
+def load_menu(db: Session) -> MenuSnapshot:
+    """Menú de la caché del worker (o del host) cargado con la sesión del request"""
+    return menu_cache.get(
+        lambda: BebidaRepository.get_all(db),
+        lambda: BebidaRepository.current_version(db),
+        lambda: BebidaRepository.last_change(db)[1],
+    )
@@ -0,0 +1,60 @@
+"""
+Peticiones condicionales: ETag, Last-Modified y respuestas 304
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Union
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+
+def make_etag(*parts: Union[str, bytes]) -> str:
+    """ETag fuerte a partir de un digest de las partes"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite devuelve fechas sin zona horaria; se asumen en UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """Encabezados ETag y Last-Modified de una respuesta"""
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evalúa If-None-Match (prioritario) o If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Las fechas HTTP no tienen fracciones de segundo
+        return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
+    return False
+
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified)
+    )
@@ -0,0 +1,41 @@
+"""
+Rutas de depuración: perfiles y consultas lentas
+Se montan bajo /debug, los perfiles con PROFILING_ENABLED y las consultas lentas con
+SLOW_QUERIES_ENDPOINT; ambas exigen el token de perfilado
+"""
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from .profiling import profile_store, require_profile_token
+from .querylog import query_log
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_profile_token)])
+slow_queries_router = APIRouter(
+    prefix="/debug", tags=["debug"], dependencies=[Depends(require_profile_token)]
+)
+
+
+@router.get("/profiles")
+def list_profiles() -> Dict[str, Any]:
+    """Perfiles guardados, del más reciente al más antiguo"""
+    return {"profiles": profile_store.index()}
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str) -> PlainTextResponse:
+    """Resumen de un perfil ordenado por tiempo acumulado"""
+    summary = profile_store.summary(profile_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Perfil '{profile_id}' no encontrado"
+        )
+    return PlainTextResponse(summary)
+
+
+@slow_queries_router.get("/slow-queries")
+def get_slow_queries() -> Dict[str, Any]:
+    """Sentencias SQL más lentas con su ruta y duración"""
+    return query_log.stats()
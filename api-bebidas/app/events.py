@@ -0,0 +1,277 @@
+"""
+Bus de cambios del menú en proceso y stream Server-Sent Events
+Los eventos salen del registro bebida_cambios: su id es la versión del registro, así
+que todos los workers numeran y describen igual cada cambio
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from .cache import menu_cache
+from .lru import lookup_cache
+from .models import CHANGE_DELETE, Bebida, BebidaDB, BebidaRepository
+from .singleflight import repository_flights
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HISTORY_SIZE = int(os.getenv("SSE_HISTORY_SIZE", "1000"))
+
+
+class MenuEvent:
+    """Cambio del menú; el id es la versión del registro de cambios"""
+
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def encode(self) -> bytes:
+        payload = json.dumps(self.data, ensure_ascii=False, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """Cola acotada de un cliente; si se llena, el cliente debe resincronizar"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.loop = loop
+        self.queue: "asyncio.Queue[MenuEvent]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event: MenuEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Un consumidor lento no frena a los demás: se le corta y resincroniza
+            self.overflowed = True
+
+
+class ChangeBus:
+    """Publica cambios desde cualquier hilo hacia los suscriptores del event loop"""
+
+    def __init__(
+        self, history_size: int = SSE_HISTORY_SIZE, queue_size: int = SSE_QUEUE_SIZE
+    ) -> None:
+        self._lock = threading.Lock()
+        self._last_id = 0
+        # El historial contiene todos los eventos con id mayor que _base
+        self._base = 0
+        self._history: Deque[MenuEvent] = deque()
+        self._subscribers: Set[Subscriber] = set()
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.dropped_subscribers = 0
+        self.resyncs = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def reset(self, version: int = 0) -> None:
+        """Empieza a publicar a partir de version, sin historial previo"""
+        with self._lock:
+            self._history.clear()
+            self._last_id = self._base = version
+
+    def publish(self, event_id: int, event_type: str, data: Dict[str, Any]) -> Optional[MenuEvent]:
+        """Registra el evento y lo entrega a cada suscriptor (thread-safe)
+
+        Los ids ya publicados se ignoran: varios hilos pueden leer el mismo tramo del registro
+        """
+        with self._lock:
+            if event_id <= self._last_id:
+                return None
+            self._last_id = event_id
+            event = MenuEvent(event_id, event_type, data)
+            self._history.append(event)
+            if len(self._history) > self.history_size:
+                self._base = self._history.popleft().id
+            subscribers = list(self._subscribers)
+        self._deliver(subscribers, event)
+        return event
+
+    def resync(self, version: int) -> MenuEvent:
+        """Hay cambios que no se pueden detallar: los clientes deben recargar el menú"""
+        with self._lock:
+            self._history.clear()
+            self._last_id = self._base = version
+            self.resyncs += 1
+            event = MenuEvent(version, "resync", {})
+            subscribers = list(self._subscribers)
+        self._deliver(subscribers, event)
+        return event
+
+    def _deliver(self, subscribers: List[Subscriber], event: MenuEvent) -> None:
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                self.unsubscribe(subscriber)
+
+    def subscribe(self) -> Subscriber:
+        """Crea un suscriptor ligado al event loop actual"""
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if subscriber.overflowed:
+                self.dropped_subscribers += 1
+
+    def events_after(self, last_event_id: int) -> Optional[List[MenuEvent]]:
+        """Eventos posteriores a last_event_id, o None si ya no están en el historial"""
+        with self._lock:
+            if last_event_id > self._last_id:
+                return None
+            if last_event_id < self._base:
+                return None
+            return [event for event in self._history if event.id > last_event_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "last_event_id": self._last_id,
+                "subscribers": len(self._subscribers),
+                "dropped_subscribers": self.dropped_subscribers,
+                "resyncs": self.resyncs,
+                "history": len(self._history),
+            }
+
+
+change_bus = ChangeBus()
+
+
+def invalidate_local_caches() -> None:
+    """Descarta todo lo que este worker guardó del menú"""
+    menu_cache.invalidate()
+    lookup_cache.clear()
+    repository_flights.forget()
+
+
+def change_event(
+    operation: str, bebida_id: int, bebida: Optional[BebidaDB]
+) -> Tuple[str, Dict[str, Any]]:
+    """Tipo y datos del evento de una entrada del registro
+
+    Se envía el estado vigente: si la fila ya no existe, la entrada se informa como borrada
+    """
+    if operation == CHANGE_DELETE or bebida is None:
+        return "deleted", {"id": bebida_id}
+    return "upserted", Bebida.model_validate(bebida).model_dump(mode="json")
+
+
+def publish_changes(db: Session, bus: Optional[ChangeBus] = None) -> int:
+    """Publica las entradas del registro que este worker aún no envió al stream"""
+    bus = change_bus if bus is None else bus
+    after = bus.last_id
+    entries = BebidaRepository.get_change_log(db, after, bus.history_size + 1)
+    if len(entries) > bus.history_size:
+        # Más cambios de los que caben en el historial: no se pueden detallar
+        bus.resync(BebidaRepository.current_version(db))
+        return 0
+    if not entries:
+        version = BebidaRepository.current_version(db)
+        if version < after:
+            # El registro retrocedió (otra base de datos): los ids previos no valen
+            bus.resync(version)
+        return 0
+    published = 0
+    for version, operation, bebida_id, bebida in entries:
+        event_type, data = change_event(operation, bebida_id, bebida)
+        if bus.publish(version, event_type, data) is not None:
+            published += 1
+    return published
+
+
+def menu_changed(db: Session) -> None:
+    """Tras una escritura confirmada: invalida las cachés del worker y publica el cambio"""
+    invalidate_local_caches()
+    try:
+        publish_changes(db)
+    except Exception:
+        # La escritura ya está confirmada; el próximo aviso publica lo pendiente
+        logger.exception("No se pudieron publicar los cambios del menú al stream")
+
+
+async def amenu_changed(db: AsyncSession) -> None:
+    """Variante para las rutas con AsyncSession"""
+    invalidate_local_caches()
+    try:
+        await db.run_sync(publish_changes)
+    except Exception:
+        logger.exception("No se pudieron publicar los cambios del menú al stream")
+
+
+def remote_menu_changed(db: Session, _change: Dict[str, Any]) -> None:
+    """Aviso de otro worker (o del polling): invalida las cachés y publica desde el registro
+
+    El contenido del aviso no se usa: un NOTIFY no trae la versión y lo que cambió se lee
+    del registro, que también cubre los avisos perdidos
+    """
+    invalidate_local_caches()
+    publish_changes(db)
+
+
+def resync_event(last_id: int) -> bytes:
+    """Pide al cliente recargar el menú completo (historial perdido o cola llena)"""
+    return f"id: {last_id}\nevent: resync\ndata: {{}}\n\n".encode("utf-8")
+
+
+async def event_stream(
+    request: Request,
+    last_event_id: Optional[int],
+    bus: ChangeBus = change_bus,
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncIterator[bytes]:
+    """Genera el stream SSE: reanudación, heartbeat y corte de consumidores lentos"""
+    # Suscribirse antes de leer el historial evita perder eventos entre ambos pasos
+    subscriber = bus.subscribe()
+    last_sent = bus.last_id if last_event_id is None else last_event_id
+    try:
+        yield f"retry: {int(heartbeat * 1000)}\n\n".encode("utf-8")
+        if last_event_id is not None:
+            replay = bus.events_after(last_event_id)
+            if replay is None:
+                last_sent = bus.last_id
+                yield resync_event(last_sent)
+            else:
+                for event in replay:
+                    last_sent = event.id
+                    yield event.encode()
+
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if subscriber.overflowed:
+                    yield resync_event(bus.last_id)
+                    return
+                yield b": ping\n\n"
+                continue
+            if event.id <= last_sent:
+                continue
+            last_sent = event.id
+            yield event.encode()
+            if subscriber.overflowed and subscriber.queue.empty():
+                yield resync_event(bus.last_id)
+                return
+    finally:
+        bus.unsubscribe(subscriber)
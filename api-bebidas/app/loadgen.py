@@ -0,0 +1,270 @@
+"""
+Generador de carga asíncrono para la API de bebidas
+
+Simula el tráfico del servicio de pedidos con N clientes virtuales concurrentes,
+contra la app ASGI en el mismo proceso o contra un servidor por socket, y reporta
+throughput, percentiles de latencia y tasa de errores en JSON.
+
+    python -m app.loadgen --clients 50 --duration 30 --seed-menu
+    python -m app.loadgen --url http://127.0.0.1:8000 --mix name=80,menu=15,create=5
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+
+DEFAULT_MIX = "name=85,menu=10,create=5"
+OPERATIONS = ("name", "name_size", "miss", "menu", "create")
+FALLBACK_NAMES = [("Latte", "small"), ("Espresso", "small"), ("Mocha", "large")]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Pesos por operación a partir de 'name=85,menu=10,create=5'"""
+    weights: Dict[str, float] = {}
+    for part in mix.split(","):
+        operation, _, weight = part.strip().partition("=")
+        if operation not in OPERATIONS:
+            raise ValueError(
+                f"Operación desconocida '{operation}'; opciones: {', '.join(OPERATIONS)}"
+            )
+        weights[operation] = float(weight)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("La mezcla debe tener al menos una operación con peso positivo")
+    return weights
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3) if values else 0.0,
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+    }
+
+
+class LoadResult:
+    """Muestras de latencia y estado por operación"""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+        self.elapsed = 0.0
+
+    def record(self, operation: str, latency: float, status: Optional[int]) -> None:
+        self.latencies[operation].append(latency)
+        self.statuses[operation][str(status) if status is not None else "exception"] += 1
+        if status is None or status >= 500:
+            self.errors[operation] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        total = sum(len(v) for v in self.latencies.values())
+        errors = sum(self.errors.values())
+        by_operation = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            by_operation[operation] = {
+                "requests": len(latencies),
+                "errors": self.errors[operation],
+                "status_codes": dict(self.statuses[operation]),
+                "latency_ms": latency_summary(latencies),
+            }
+        return {
+            "duration_s": round(self.elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / self.elapsed, 2) if self.elapsed else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "latency_ms": latency_summary(
+                list(itertools.chain.from_iterable(self.latencies.values()))
+            ),
+            "by_operation": by_operation,
+        }
+
+
+def build_request(
+    operation: str, catalog: Sequence[Tuple[str, str]], rng: random.Random
+) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """Método, URL y cuerpo de una petición de la operación dada"""
+    name, size = rng.choice(catalog)
+    if operation == "name":
+        return "GET", f"/menu/{quote(name)}", None
+    if operation == "name_size":
+        return "GET", f"/menu/{quote(name)}/{size}", None
+    if operation == "miss":
+        return "GET", f"/menu/{quote('No existe ' + uuid.uuid4().hex[:8])}", None
+    if operation == "menu":
+        return "GET", "/menu", None
+    body = {"name": f"Carga {uuid.uuid4().hex[:12]}", "size": "medium", "price": 3.0}
+    return "POST", "/menu", body
+
+
+def retry_after_seconds(response: httpx.Response) -> float:
+    """Pausa pedida por el servidor al descartar la petición"""
+    try:
+        return float(response.headers.get("retry-after", "0"))
+    except ValueError:
+        return 0.0
+
+
+async def load_catalog(client: httpx.AsyncClient) -> List[Tuple[str, str]]:
+    """Pares (nombre, tamaño) reales del menú para que las búsquedas acierten"""
+    response = await client.get("/menu")
+    if response.status_code != 200:
+        return FALLBACK_NAMES
+    catalog = [(b["name"], b["size"]) for b in response.json()]
+    return catalog or FALLBACK_NAMES
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    clients: int,
+    duration: float,
+    mix: Dict[str, float],
+    max_requests: Optional[int] = None,
+    think_time: float = 0.0,
+    seed: Optional[int] = None,
+    honor_retry_after: bool = True,
+) -> LoadResult:
+    """Lanza los clientes virtuales hasta agotar la duración o el número de peticiones"""
+    catalog = await load_catalog(client)
+    operations, weights = zip(*mix.items())
+    result = LoadResult()
+    issued = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def virtual_client(index: int) -> None:
+        rng = random.Random(None if seed is None else seed + index)
+        while time.perf_counter() < deadline:
+            if max_requests is not None and next(issued) >= max_requests:
+                return
+            operation = rng.choices(operations, weights)[0]
+            method, url, body = build_request(operation, catalog, rng)
+            start = time.perf_counter()
+            pause = think_time
+            try:
+                response = await client.request(method, url, json=body)
+                status: Optional[int] = response.status_code
+                if status == 503 and honor_retry_after:
+                    pause = max(pause, retry_after_seconds(response))
+            except httpx.HTTPError:
+                status = None
+            result.record(operation, time.perf_counter() - start, status)
+            # En proceso una respuesta inmediata (un 503, por ejemplo) no suspende la tarea;
+            # sin ceder el loop un solo cliente acapararía la corrida
+            await asyncio.sleep(min(pause, max(0.0, deadline - time.perf_counter())))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_client(i) for i in range(clients)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    async with AsyncExitStack() as stack:
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+            target = args.url
+        else:
+            from .main import app
+
+            # En proceso no hay servidor: se ejecutan a mano los eventos de arranque
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            # Una excepción de la app cuenta como 500, igual que detrás de uvicorn
+            transport = httpx.ASGITransport(
+                app=app, raise_app_exceptions=False  # type: ignore[arg-type]
+            )
+            client = httpx.AsyncClient(
+                transport=transport,
+                base_url="http://loadgen", timeout=args.timeout, limits=limits
+            )
+            target = "in-process"
+        await stack.enter_async_context(client)
+
+        if args.seed_menu:
+            await client.post("/menu/seed")
+        mix = parse_mix(args.mix)
+        result = await run_load(
+            client, args.clients, args.duration, mix,
+            max_requests=args.requests, think_time=args.think_ms / 1000, seed=args.random_seed,
+            honor_retry_after=not args.ignore_retry_after
+        )
+
+    return {
+        "config": {
+            "target": target,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "max_requests": args.requests,
+            "mix": mix,
+            "think_ms": args.think_ms,
+            "honor_retry_after": not args.ignore_retry_after,
+        },
+        **result.summary(),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.loadgen", description="Generador de carga para la API de bebidas"
+    )
+    parser.add_argument("--url", help="URL del servidor; sin ella se usa la app en proceso")
+    parser.add_argument("--clients", type=int, default=20, help="Clientes virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duración en segundos")
+    parser.add_argument("--requests", type=int, help="Tope total de peticiones")
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX,
+        help=f"Pesos por operación ({', '.join(OPERATIONS)}); por defecto {DEFAULT_MIX}"
+    )
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pausa entre peticiones")
+    parser.add_argument(
+        "--ignore-retry-after", action="store_true",
+        help="Reintenta de inmediato tras un 503 en vez de esperar lo que pide Retry-After"
+    )
+    parser.add_argument("--timeout", type=float, default=10.0, help="Timeout por petición")
+    parser.add_argument("--seed-menu", action="store_true", help="Llama a POST /menu/seed antes")
+    parser.add_argument("--random-seed", type=int, help="Semilla para repetir la misma secuencia")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
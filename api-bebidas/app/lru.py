@@ -0,0 +1,150 @@
+"""
+Caché LRU con TTL para las búsquedas de una sola bebida
+Acotada en entradas y en bytes, con contadores para ajustar su tamaño en producción
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from fastapi.responses import Response
+
+from .conditional import validator_headers
+
+LOOKUP_CACHE_ENTRIES = int(os.getenv("LOOKUP_CACHE_ENTRIES", "5000"))
+LOOKUP_CACHE_BYTES = int(os.getenv("LOOKUP_CACHE_BYTES", str(4 * 1024 * 1024)))
+LOOKUP_CACHE_TTL = float(os.getenv("LOOKUP_CACHE_TTL", "300"))
+
+
+class CachedResponse(NamedTuple):
+    """Respuesta JSON ya codificada con sus validadores"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+    @classmethod
+    def from_payload(
+        cls, payload: Any, etag: str, last_modified: Optional[datetime]
+    ) -> "CachedResponse":
+        body = json.dumps(
+            payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        return cls(body, etag, last_modified)
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            media_type="application/json",
+            headers=validator_headers(self.etag, self.last_modified)
+        )
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires")
+
+    def __init__(self, value: Any, size: int, expires: float) -> None:
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+
+class LRUCache:
+    """LRU thread-safe con vencimiento por TTL y límites de entradas y bytes"""
+
+    def __init__(
+        self,
+        max_entries: int = LOOKUP_CACHE_ENTRIES,
+        max_bytes: int = LOOKUP_CACHE_BYTES,
+        ttl: float = LOOKUP_CACHE_TTL,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"capacity": 0, "bytes": 0, "expired": 0}
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Se toma antes de consultar la base y se pasa a put()"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires <= time.monotonic():
+                self._remove(key)
+                self.evictions["expired"] += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, size: int, generation: Optional[int] = None) -> bool:
+        """Guarda el valor salvo que haya habido una invalidación desde generation"""
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._evict("capacity")
+            while self._bytes > self.max_bytes:
+                self._evict("bytes")
+            return True
+
+    def _remove(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+    def _evict(self, reason: str) -> None:
+        key = next(iter(self._entries))
+        self._remove(key)
+        self.evictions[reason] += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Invalida todo; las cargas en curso ya no se guardan"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": dict(self.evictions),
+                "invalidations": self.invalidations,
+            }
+
+
+lookup_cache = LRUCache()
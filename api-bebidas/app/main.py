@@ -2,36 +2,97 @@
 API de Bebidas - VirtualCoffee
 FastAPI con PostgreSQL y SQLAlchemy
 """
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, status, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 
-from .database import engine, get_db, Base
-from .models import Bebida, BebidaCreate, BebidaRepository, BebidaDB
+from .admission import ADMISSION_ENABLED, AdmissionMiddleware, admission
+from .async_routes import router as async_router
+from .cache import load_menu, menu_cache
+from .conditional import is_not_modified, make_etag, not_modified, validator_headers
+from .database import DB_MODE, engine, get_db, Base
+from .debug_routes import router as debug_router, slow_queries_router
+from .events import change_bus, event_stream, menu_changed, remote_menu_changed
+from .notify import CACHE_SYNC_ENABLED, ChangeListener
+from .lru import CachedResponse, lookup_cache
+from .metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, registry
+from .pool import pool_status
+from .profiling import PROFILING_ENABLED, ProfiledRoute, ProfilingMiddleware
+from .querylog import SLOW_QUERIES_ENDPOINT
+from .search import name_filter, search_bebidas
+from .singleflight import repository_flights
+from .models import (
+    Bebida,
+    BebidaCreate,
+    BebidaBulkRequest,
+    BebidaBulkResponse,
+    BebidaChanges,
+    BebidaDB,
+    BebidaLookupRequest,
+    BebidaLookupResponse,
+    BebidaPrecio,
+    BebidaQuoteRequest,
+    BebidaQuoteResponse,
+    BebidaRepository,
+    normalize_name,
+)
 
 app = FastAPI(
     title="VirtualCoffee - API Bebidas",
     description="API para gestionar el menú de bebidas",
     version="2.0.0"
 )
+# Las rutas se perfilan solo cuando ProfilingMiddleware elige la petición
+app.router.route_class = ProfiledRoute
+
+
+change_listener = ChangeListener(engine, remote_menu_changed)
 
 
 @app.on_event("startup")
-async def startup_event():
+async def startup_event() -> None:
     Base.metadata.create_all(bind=engine)
+    # Los ids del stream son versiones del registro: se parte de la actual
+    with Session(engine) as db:
+        change_bus.reset(BebidaRepository.current_version(db))
+    if CACHE_SYNC_ENABLED:
+        change_listener.start()
+
 
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    change_listener.stop()
+
+if DB_MODE == "async":
+    app.include_router(async_router)
+# Los perfiles solo se exponen con el perfilado activo; las consultas lentas, aparte
+if PROFILING_ENABLED:
+    app.include_router(debug_router)
+if SLOW_QUERIES_ENDPOINT:
+    app.include_router(slow_queries_router)
+
+# Queda dentro de CORS para que los 503 también lleven sus cabeceras
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:4200", "http://localhost:3000", "http://localhost:8081"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Sin esto el navegador oculta las cabeceras de paginación y de caché condicional
+    expose_headers=["X-Next-After-Id", "ETag", "Last-Modified"],
 )
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/")
-def root():
+def root() -> Dict[str, Any]:
     """Endpoint raíz - Health check"""
     return {
         "message": "API de Bebidas - VirtualCoffee",
@@ -41,12 +102,92 @@ def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    """Métricas de peticiones y consultas en formato Prometheus"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/metrics/cache")
+def get_cache_metrics() -> Dict[str, Any]:
+    """Estadísticas de la caché del menú"""
+    return {
+        **menu_cache.stats(),
+        "sync": change_listener.stats(),
+        "unknown_names": name_filter.stats(),
+    }
+
+
+@app.get("/metrics/coalescing")
+def get_coalescing_metrics() -> Dict[str, Any]:
+    """Consultas idénticas concurrentes que compartieron una sola ejecución"""
+    return repository_flights.stats()
+
+
+@app.get("/metrics/lookup-cache")
+def get_lookup_cache_metrics() -> Dict[str, Any]:
+    """Aciertos, fallos y desalojos de la caché de búsquedas por nombre"""
+    return lookup_cache.stats()
+
+
+@app.get("/metrics/admission")
+def get_admission_metrics() -> Dict[str, Any]:
+    """Cupos en uso, cola de espera y descartes del control de admisión"""
+    return {"enabled": ADMISSION_ENABLED, **admission.stats()}
+
+
+@app.get("/metrics/pool")
+def get_pool_metrics() -> Dict[str, Any]:
+    """Estado del pool de conexiones a la base de datos"""
+    return pool_status(engine.pool)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+
+
+def stream_menu(db: Session, after_id: int, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Emite el menú (o una página si hay limit) como NDJSON leyendo las filas por bloques"""
+    # La sesión del request se cierra antes de enviar el cuerpo, así que el
+    # stream abre la suya sobre el mismo motor
+    stream_db = Session(bind=db.get_bind())
+    try:
+        for bebida in BebidaRepository.iter_all(stream_db, after_id, STREAM_CHUNK_SIZE, limit):
+            yield Bebida.model_validate(bebida).model_dump_json().encode() + b"\n"
+    finally:
+        stream_db.close()
+
+
 @app.get("/menu", response_model=List[Bebida])
-def get_menu(db: Session = Depends(get_db)):
+def get_menu(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0, description="Último id de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página"),
+    db: Session = Depends(get_db)
+) -> Response:
     """Obtiene el menú completo de bebidas"""
     try:
-        bebidas_db = BebidaRepository.get_all(db)
-        return [Bebida.model_validate(bebida) for bebida in bebidas_db]
+        if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            return StreamingResponse(
+                stream_menu(db, after_id or 0, limit), media_type=NDJSON_MEDIA_TYPE
+            )
+
+        if after_id is not None or limit is not None:
+            page_size = limit or DEFAULT_PAGE_SIZE
+            bebidas_db = BebidaRepository.get_page(db, after_id or 0, page_size)
+            headers = {}
+            if len(bebidas_db) == page_size:
+                headers["X-Next-After-Id"] = str(bebidas_db[-1].id)
+            return JSONResponse(
+                content=[Bebida.model_validate(b).model_dump() for b in bebidas_db],
+                headers=headers
+            )
+
+        snapshot = load_menu(db)
+        if is_not_modified(request, snapshot.etag, snapshot.last_modified):
+            return not_modified(snapshot.etag, snapshot.last_modified)
+        return snapshot.to_response(request.headers.get("accept-encoding", ""))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,17 +195,136 @@ def get_menu(db: Session = Depends(get_db)):
         )
 
 
+@app.get("/menu/search", response_model=List[Bebida])
+def search_menu(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Texto a buscar en el nombre"),
+    limit: int = Query(10, ge=1, le=100, description="Máximo de resultados"),
+    db: Session = Depends(get_db)
+) -> Response:
+    """Busca bebidas por nombre ordenadas por relevancia"""
+    try:
+        # Los validadores salen del registro de cambios, sin serializar el menú
+        version, changed_at = BebidaRepository.last_change(db)
+        etag = make_etag(str(version), "search", normalize_name(q), str(limit))
+        if is_not_modified(request, etag, changed_at):
+            return not_modified(etag, changed_at)
+        return JSONResponse(
+            content=search_bebidas(db, q, limit, version),
+            headers=validator_headers(etag, changed_at)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar bebidas: {str(e)}"
+        )
+
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+@app.get("/menu/stream")
+def stream_menu_changes(
+    request: Request,
+    last_event_id: Optional[int] = Query(
+        None, ge=0, description="Último evento recibido (alternativa al header Last-Event-ID)"
+    )
+) -> StreamingResponse:
+    """Stream Server-Sent Events con los cambios del menú"""
+    header = request.headers.get("last-event-id")
+    if last_event_id is None and header and header.isdigit():
+        last_event_id = int(header)
+    return StreamingResponse(
+        event_stream(request, last_event_id),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics/stream")
+def get_stream_metrics() -> Dict[str, Any]:
+    """Suscriptores y eventos del stream de cambios"""
+    return change_bus.stats()
+
+
+@app.get("/menu/changes", response_model=BebidaChanges)
+def get_menu_changes(
+    since: int = Query(0, ge=0, description="Versión de la réplica del cliente"),
+    db: Session = Depends(get_db)
+) -> BebidaChanges:
+    """Cambios del menú desde una versión, con los borrados como tombstones"""
+    try:
+        return BebidaRepository.get_changes_since(db, since)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener cambios del menú: {str(e)}"
+        )
+
+
 @app.get("/menu/{name}", response_model=Bebida)
-def get_bebida_by_name(name: str, db: Session = Depends(get_db)):
+def get_bebida_by_name(
+    name: str, request: Request, db: Session = Depends(get_db)
+) -> Response:
     """Busca una bebida por nombre"""
     try:
-        bebida_db = BebidaRepository.get_by_name(db, name)
-        if not bebida_db:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Bebida '{name}' no encontrada en el menú"
+        # El resultado depende de todo el menú (ranking), así que se valida contra la
+        # versión del registro de cambios
+        key = (normalize_name(name), None)
+        cached = lookup_cache.get(key)
+        if cached is None:
+            generation = lookup_cache.generation
+            version, changed_at = BebidaRepository.last_change(db)
+            # Primero se resuelve si existe: If-None-Match: * no aplica a un 404
+            resultados = search_bebidas(db, name, 1, version)
+            if not resultados:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Bebida '{name}' no encontrada en el menú"
+                )
+            etag = make_etag(str(version), "name", normalize_name(name))
+            cached = CachedResponse.from_payload(resultados[0], etag, changed_at)
+            lookup_cache.put(key, cached, len(cached.body), generation)
+        if is_not_modified(request, cached.etag, cached.last_modified):
+            return not_modified(cached.etag, cached.last_modified)
+        return cached.to_response()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar bebida: {str(e)}"
+        )
+
+
+@app.get("/menu/{name}/{size}", response_model=Bebida)
+def get_bebida_by_name_and_size(
+    name: str, size: str, request: Request, db: Session = Depends(get_db)
+) -> Response:
+    """Busca una bebida por nombre y tamaño exactos"""
+    try:
+        key = (normalize_name(name), size.lower())
+        cached = lookup_cache.get(key)
+        if cached is None:
+            generation = lookup_cache.generation
+            bebida_db = BebidaRepository.get_by_name_and_size(db, name, size)
+            if not bebida_db:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Bebida '{name}' no disponible en tamaño '{size}'"
+                )
+            updated_at = bebida_db.updated_at
+            etag = make_etag(
+                str(bebida_db.id), bebida_db.name, bebida_db.size, repr(bebida_db.price),
+                updated_at.isoformat() if updated_at else ""
+            )
+            cached = CachedResponse.from_payload(
+                Bebida.model_validate(bebida_db).model_dump(), etag, updated_at
             )
-        return Bebida.model_validate(bebida_db)
+            lookup_cache.put(key, cached, len(cached.body), generation)
+        if is_not_modified(request, cached.etag, cached.last_modified):
+            return not_modified(cached.etag, cached.last_modified)
+        return cached.to_response()
     except HTTPException:
         raise
     except Exception as e:
@@ -74,19 +334,64 @@ def get_bebida_by_name(name: str, db: Session = Depends(get_db)):
         )
 
 
+@app.post("/menu/lookup", response_model=BebidaLookupResponse)
+def lookup_bebidas(
+    lookup: BebidaLookupRequest, request: Request, db: Session = Depends(get_db)
+) -> Response:
+    """Resuelve varias bebidas por nombre y tamaño en una sola consulta"""
+    try:
+        version, changed_at = BebidaRepository.last_change(db)
+        pairs = [(item.name, item.size) for item in lookup.items]
+        etag = make_etag(
+            str(version), "lookup", *(f"{normalize_name(n)}/{s}" for n, s in pairs)
+        )
+        if is_not_modified(request, etag, changed_at):
+            return not_modified(etag, changed_at)
+
+        bebidas_db = BebidaRepository.get_many_by_name_and_size(db, pairs)
+        resultado = BebidaLookupResponse.from_matches(lookup.items, bebidas_db)
+        return JSONResponse(
+            content=resultado.model_dump(),
+            headers=validator_headers(etag, changed_at)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al resolver bebidas: {str(e)}"
+        )
+
+
+@app.post("/menu/quote", response_model=BebidaQuoteResponse)
+def quote_pedido(
+    pedido: BebidaQuoteRequest, db: Session = Depends(get_db)
+) -> BebidaQuoteResponse:
+    """Cotiza un pedido completo: precio por línea, faltantes y total"""
+    try:
+        bebidas_db = BebidaRepository.get_many_by_name_and_size(
+            db, [(item.name, item.size) for item in pedido.items]
+        )
+        return BebidaQuoteResponse.from_matches(pedido.items, bebidas_db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al cotizar el pedido: {str(e)}"
+        )
+
+
 @app.post("/menu", response_model=Bebida, status_code=status.HTTP_201_CREATED)
-def create_bebida(bebida: BebidaCreate, db: Session = Depends(get_db)):
+def create_bebida(bebida: BebidaCreate, db: Session = Depends(get_db)) -> Bebida:
     """Crea una nueva bebida en el menú"""
     try:
-        if BebidaRepository.exists_by_name_and_size(db, bebida.name, bebida.size):
+        nueva_bebida_db = BebidaRepository.create(db, bebida)
+        if nueva_bebida_db is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Ya existe una bebida '{bebida.name}' con tamaño '{bebida.size}'"
             )
-        
-        nueva_bebida_db = BebidaRepository.create(db, bebida)
-        return Bebida.model_validate(nueva_bebida_db)
-    
+        nueva_bebida = Bebida.model_validate(nueva_bebida_db)
+        menu_changed(db)
+        return nueva_bebida
+
     except HTTPException:
         raise
     except Exception as e:
@@ -96,8 +401,55 @@ def create_bebida(bebida: BebidaCreate, db: Session = Depends(get_db)):
         )
 
 
+@app.put("/menu/{name}/{size}", response_model=Bebida)
+def upsert_bebida(
+    name: str, size: str, precio: BebidaPrecio, db: Session = Depends(get_db)
+) -> Bebida:
+    """Crea la bebida o actualiza su precio si ya existe"""
+    try:
+        bebida = BebidaCreate(name=name, size=size, price=precio.price)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+
+    try:
+        bebida_db = BebidaRepository.upsert(db, bebida)
+        guardada = Bebida.model_validate(bebida_db)
+        menu_changed(db)
+        return guardada
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al guardar bebida: {str(e)}"
+        )
+
+
+@app.post("/menu/bulk", response_model=BebidaBulkResponse, status_code=status.HTTP_201_CREATED)
+def bulk_create_bebidas(
+    lote: BebidaBulkRequest, db: Session = Depends(get_db)
+) -> BebidaBulkResponse:
+    """Inserta varias bebidas en una sola transacción"""
+    try:
+        resultados = BebidaRepository.bulk_create(db, lote.items)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al insertar bebidas: {str(e)}"
+        )
+
+    inserted = sum(1 for r in resultados if r.status == "inserted")
+    if inserted:
+        menu_changed(db)
+    return BebidaBulkResponse(
+        inserted=inserted, skipped=len(resultados) - inserted, results=resultados
+    )
+
+
 @app.delete("/menu/{bebida_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_bebida(bebida_id: int, db: Session = Depends(get_db)):
+def delete_bebida(bebida_id: int, db: Session = Depends(get_db)) -> None:
     """Elimina una bebida del menú"""
     try:
         if not BebidaRepository.delete_by_id(db, bebida_id):
@@ -105,6 +457,7 @@ def delete_bebida(bebida_id: int, db: Session = Depends(get_db)):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Bebida con ID {bebida_id} no encontrada"
             )
+        menu_changed(db)
     except HTTPException:
         raise
     except Exception as e:
@@ -114,9 +467,9 @@ def delete_bebida(bebida_id: int, db: Session = Depends(get_db)):
         )
 
 @app.post("/menu/seed", status_code=status.HTTP_201_CREATED)
-def seed_menu(db: Session = Depends(get_db)):
+def seed_menu(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Inicializa el menú con bebidas de ejemplo"""
-    bebidas_ejemplo = [
+    bebidas_ejemplo: List[Dict[str, Any]] = [
         {"name": "Latte", "size": "small", "price": 2.50},
         {"name": "Latte", "size": "medium", "price": 3.50},
         {"name": "Latte", "size": "large", "price": 4.50},
@@ -128,20 +481,23 @@ def seed_menu(db: Session = Depends(get_db)):
         {"name": "Americano", "size": "large", "price": 3.25},
         {"name": "Mocha", "size": "large", "price": 4.75},
     ]
-    
-    created_count = 0
-    for bebida_data in bebidas_ejemplo:
-        try:
-            if not BebidaRepository.exists_by_name_and_size(
-                db, bebida_data["name"], bebida_data["size"]
-            ):
-                bebida_create = BebidaCreate(**bebida_data)
-                BebidaRepository.create(db, bebida_create)
-                created_count += 1
-        except Exception:
-            continue
-    
+
+    try:
+        resultados = BebidaRepository.bulk_create(
+            db, [BebidaCreate(**bebida_data) for bebida_data in bebidas_ejemplo]
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al inicializar el menú: {str(e)}"
+        )
+    created_count = sum(1 for r in resultados if r.status == "inserted")
+
+    if created_count:
+        menu_changed(db)
+
     return {
         "message": f"Menú inicializado con {created_count} bebidas",
-        "total_bebidas": len(BebidaRepository.get_all(db))
-    }
\ No newline at end of file
+        "total_bebidas": BebidaRepository.count(db)
+    }
@@ -0,0 +1,267 @@
+"""
+Métricas en formato de texto de Prometheus
+Un middleware ASGI mide latencia, peticiones en curso y códigos de estado por ruta,
+y los eventos del motor de SQLAlchemy suman consultas y tiempo SQL por request
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExceptionContext, ExecutionContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+
+
+def route_template(scope: Scope) -> str:
+    """Plantilla de la ruta (/menu/{name}) para no crear una serie por cada URL"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Familia de series con el mismo nombre y etiquetas"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Por serie: conteo de cada bucket (no acumulado), suma y total
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, (list(c), s[0])) for labels, (c, s) in self._series.items())
+        lines = self.header()
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(float(bound))}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas en /metrics"""
+
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+))
+REQUESTS_TOTAL = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", ("method",)
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "Consultas SQL por petición", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+REQUEST_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Tiempo SQL por petición", ("method", "route")
+))
+DB_QUERIES_TOTAL = registry.register(Counter(
+    "db_queries_total", "Consultas SQL ejecutadas"
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL"
+))
+
+
+class RequestStats:
+    """Consultas y tiempo SQL acumulados por la petición en curso"""
+
+    __slots__ = ("queries", "db_seconds", "scope")
+
+    def __init__(self, scope: Optional[Scope] = None) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.scope = scope
+
+
+# El threadpool de las rutas sync copia el contexto, así que ve el mismo objeto
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+# Reciben (sentencia, segundos) de cada consulta ya medida, sin listeners propios
+query_observers: List[Callable[[str, float], None]] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Connection, cursor: Any, statement: str, parameters: Any,
+    context: Optional[ExecutionContext], executemany: bool,
+) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Connection, cursor: Any, statement: str, parameters: Any,
+    context: Optional[ExecutionContext], executemany: bool,
+) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERIES_TOTAL.inc()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    for observer in query_observers:
+        observer(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context: ExceptionContext) -> None:
+    # Una consulta fallida no llega a after_cursor_execute
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: no envuelve el cuerpo como BaseHTTPMiddleware"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec((method,))
+            current_request.reset(token)
+            labels = (method, route_template(scope))
+            REQUEST_LATENCY.observe(elapsed, labels)
+            REQUESTS_TOTAL.inc(labels + (str(status_code),))
+            REQUEST_QUERIES.observe(stats.queries, labels)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, labels)
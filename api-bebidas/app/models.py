@@ -1,26 +1,130 @@
 """
 Modelos de base de datos SQLAlchemy para API Bebidas
 """
-from sqlalchemy import Column, Integer, String, Float, Index
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import csv
+import functools
+import io
+import json
+import os
+from datetime import datetime
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    case,
+    event,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import Mapped, Session, mapped_column
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from pydantic import BaseModel, Field, validator
 from .database import Base
+from .singleflight import repository_flights
+
+
+def normalize_name(name: str) -> str:
+    """Nombre canónico para comparar sin importar mayúsculas ni espacios"""
+    return " ".join(name.split()).lower()
+
 
 class BebidaDB(Base):
     """Modelo de base de datos para bebidas"""
     __tablename__ = "bebidas"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False)
-    size = Column(String(20), nullable=False)
-    price = Column(Float, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    normalized_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    size: Mapped[str] = mapped_column(String(20), nullable=False)
+    price: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
     
     __table_args__ = (
         Index('idx_bebida_name_size', 'name', 'size'),
+        Index('uq_bebida_normalized_name_size', 'normalized_name', 'size', unique=True),
     )
 
 
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+class BebidaCambioDB(Base):
+    """Registro de cambios del menú; su id es el token de versión para sincronizar"""
+    __tablename__ = "bebida_cambios"
+
+    version: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True
+    )
+    bebida_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    operation: Mapped[str] = mapped_column(String(10), nullable=False)
+    changed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+# Serializa las escrituras del registro para que las versiones se confirmen en orden
+# y un cliente nunca salte un cambio con versión menor confirmado después
+CHANGE_LOG_LOCK = text("SELECT pg_advisory_xact_lock(7310)")
+
+
+# Canal NOTIFY por el que cada worker se entera de las escrituras de los demás
+CHANGE_CHANNEL = "bebidas_cambios"
+CHANGE_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+# PostgreSQL limita el payload a 8000 bytes
+NOTIFY_MAX_PAYLOAD = 7900
+
+
+def change_notification(bebida_ids: Sequence[int], operation: str) -> str:
+    """Payload del NOTIFY; el pid permite a cada worker ignorar sus propias escrituras"""
+    payload = {"pid": os.getpid(), "operation": operation, "ids": list(bebida_ids)}
+    encoded = json.dumps(payload, separators=(",", ":"))
+    if len(encoded) > NOTIFY_MAX_PAYLOAD:
+        # Lotes grandes: basta con avisar que hubo cambios
+        del payload["ids"]
+        payload["count"] = len(bebida_ids)
+        encoded = json.dumps(payload, separators=(",", ":"))
+    return encoded
+
+
+def change_rows(bebida_ids: Sequence[int], operation: str) -> List[Dict[str, Any]]:
+    """Filas del registro de cambios para un grupo de bebidas"""
+    return [{"bebida_id": bebida_id, "operation": operation} for bebida_id in bebida_ids]
+
+
+@event.listens_for(BebidaDB, "before_insert")
+@event.listens_for(BebidaDB, "before_update")
+def _set_normalized_name(mapper: Any, connection: Any, target: BebidaDB) -> None:
+    target.normalized_name = normalize_name(target.name)
+
+
+# Índice trigram para búsquedas por subcadena (solo PostgreSQL)
+event.listen(
+    BebidaDB.__table__,
+    "after_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+        "CREATE INDEX IF NOT EXISTS idx_bebidas_name_trgm "
+        "ON bebidas USING gin (normalized_name gin_trgm_ops)"
+    ).execute_if(dialect="postgresql")
+)
+
+
 class BebidaBase(BaseModel):
     """Modelo base para bebidas"""
     name: str = Field(..., min_length=1, max_length=100, description="Nombre de la bebida")
@@ -28,14 +132,14 @@ class BebidaBase(BaseModel):
     price: float = Field(..., gt=0, le=100, description="Precio debe ser positivo y menor a 100")
     
     @validator('name')
-    def validate_name(cls, v):
+    def validate_name(cls, v: str) -> str:
         """Valida el nombre de la bebida"""
         if not v.strip():
             raise ValueError('El nombre no puede estar vacío')
         return v.strip().title()
     
     @validator('size')
-    def validate_size(cls, v):
+    def validate_size(cls, v: str) -> str:
         """Valida el tamaño"""
         valid_sizes = ['small', 'medium', 'large']
         if v.lower() not in valid_sizes:
@@ -56,6 +160,198 @@ class Bebida(BebidaBase):
         from_attributes = True
 
 
+class BebidaPrecio(BaseModel):
+    """Precio a fijar al hacer upsert de una bebida"""
+    price: float = Field(..., gt=0, le=100, description="Precio debe ser positivo y menor a 100")
+
+
+class BebidaLookupItem(BaseModel):
+    """Par (nombre, tamaño) a resolver en una búsqueda por lote"""
+    name: str = Field(..., min_length=1, max_length=100, description="Nombre de la bebida")
+    size: str = Field(..., min_length=1, max_length=20, description="Tamaño solicitado")
+
+    @validator('name')
+    def validate_name(cls, v: str) -> str:
+        """Normaliza el nombre solicitado"""
+        if not v.strip():
+            raise ValueError('El nombre no puede estar vacío')
+        return v.strip()
+
+    @validator('size')
+    def validate_size(cls, v: str) -> str:
+        """Normaliza el tamaño solicitado"""
+        return v.strip().lower()
+
+
+class BebidaLookupRequest(BaseModel):
+    """Lote de bebidas a resolver en una sola consulta"""
+    items: List[BebidaLookupItem] = Field(..., min_length=1, max_length=200)
+
+
+class BebidaLookupResponse(BaseModel):
+    """Resultado de la búsqueda por lote: coincidencias y faltantes"""
+    found: List[Bebida]
+    missing: List[BebidaLookupItem]
+
+    @classmethod
+    def from_matches(
+        cls, items: Sequence[BebidaLookupItem], bebidas: Sequence["BebidaDB"]
+    ) -> "BebidaLookupResponse":
+        """Empareja los items pedidos con las filas encontradas, en orden"""
+        encontradas = {(bebida.normalized_name, bebida.size): bebida for bebida in bebidas}
+        found = []
+        missing = []
+        for item in items:
+            bebida_db = encontradas.get((normalize_name(item.name), item.size))
+            if bebida_db is None:
+                missing.append(item)
+            else:
+                found.append(Bebida.model_validate(bebida_db))
+        return cls(found=found, missing=missing)
+
+
+class BebidaChanges(BaseModel):
+    """Cambios del menú desde una versión: filas nuevas o modificadas y borradas"""
+    since: int
+    version: int
+    full_resync: bool = Field(
+        default=False, description="True si el cliente debe reemplazar su réplica completa"
+    )
+    upserts: List[Bebida]
+    deleted: List[int]
+
+
+class BebidaBulkRequest(BaseModel):
+    """Lote de bebidas a insertar en una sola transacción"""
+    items: List[BebidaCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class BebidaBulkResult(BaseModel):
+    """Resultado de un item del lote"""
+    index: int
+    name: str
+    size: str
+    status: str = Field(..., description="inserted o skipped")
+    id: Optional[int] = None
+    reason: Optional[str] = None
+
+
+class BebidaBulkResponse(BaseModel):
+    """Resumen de la inserción por lote"""
+    inserted: int
+    skipped: int
+    results: List[BebidaBulkResult]
+
+
+class BebidaQuoteItem(BebidaLookupItem):
+    """Línea de un pedido a cotizar"""
+    quantity: int = Field(..., ge=1, le=1000, description="Cantidad pedida")
+
+
+class BebidaQuoteRequest(BaseModel):
+    """Pedido completo a cotizar en una sola consulta"""
+    items: List[BebidaQuoteItem] = Field(..., min_length=1, max_length=200)
+
+
+class BebidaQuoteLine(BaseModel):
+    """Precio de una línea, o el motivo por el que no está disponible"""
+    index: int
+    name: str
+    size: str
+    quantity: int
+    available: bool
+    id: Optional[int] = None
+    unit_price: Optional[float] = None
+    line_total: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BebidaQuoteResponse(BaseModel):
+    """Cotización del pedido: líneas y total de las disponibles"""
+    available: bool = Field(..., description="True si todas las líneas están disponibles")
+    total: float
+    lines: List[BebidaQuoteLine]
+
+    @classmethod
+    def from_matches(
+        cls, items: Sequence[BebidaQuoteItem], bebidas: Sequence["BebidaDB"]
+    ) -> "BebidaQuoteResponse":
+        """Precia cada línea con las filas encontradas, en el orden pedido"""
+        encontradas = {(bebida.normalized_name, bebida.size): bebida for bebida in bebidas}
+        lines = []
+        for index, item in enumerate(items):
+            bebida_db = encontradas.get((normalize_name(item.name), item.size))
+            if bebida_db is None:
+                lines.append(BebidaQuoteLine(
+                    index=index, name=item.name, size=item.size, quantity=item.quantity,
+                    available=False,
+                    error=f"Bebida '{item.name}' no disponible en tamaño '{item.size}'"
+                ))
+            else:
+                lines.append(BebidaQuoteLine(
+                    index=index, name=bebida_db.name, size=bebida_db.size,
+                    quantity=item.quantity, available=True, id=bebida_db.id,
+                    unit_price=bebida_db.price,
+                    line_total=round(bebida_db.price * item.quantity, 2)
+                ))
+        return cls(
+            available=all(line.available for line in lines),
+            total=round(sum(line.line_total or 0.0 for line in lines), 2),
+            lines=lines
+        )
+
+
+def bebida_row(bebida: BebidaCreate) -> Dict[str, Any]:
+    """Valores de inserción de una bebida, con su nombre normalizado"""
+    return {
+        "name": bebida.name,
+        "normalized_name": normalize_name(bebida.name),
+        "size": bebida.size,
+        "price": bebida.price,
+    }
+
+
+def dialect_insert(dialect_name: str) -> Any:
+    """insert() con soporte de ON CONFLICT para el motor en uso"""
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def search_statement(query: str, limit: int) -> Select:
+    """Consulta por subcadena del nombre normalizado (índice trigram en PostgreSQL)"""
+    nombre = BebidaDB.normalized_name
+    rank = case(
+        (nombre == query, 0),
+        (nombre.startswith(query, autoescape=True), 1),
+        else_=2
+    )
+    return select(BebidaDB).where(
+        nombre.contains(query, autoescape=True)
+    ).order_by(
+        rank, func.length(BebidaDB.name), BebidaDB.name, BebidaDB.id
+    ).limit(limit)
+
+
+def _freeze(value: Any) -> Any:
+    """Versión hashable de los argumentos para usarlos como clave"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def coalesced(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Comparte la consulta entre llamadas concurrentes con los mismos argumentos
+
+    Solo para resultados inmutables: las filas ORM pertenecen a la sesión que las cargó,
+    y el menú completo ya se comparte serializado en MenuCache
+    """
+    @functools.wraps(method)
+    def wrapper(db: Session, *args: Any) -> Any:
+        key = (method.__name__, db.get_bind(), _freeze(args))
+        result, _ = repository_flights.do(key, lambda: method(db, *args))
+        return result
+    return wrapper
+
+
 class BebidaRepository:
     """Repositorio para operaciones de bebidas"""
     
@@ -65,47 +361,352 @@ class BebidaRepository:
         return db.query(BebidaDB).all()
     
     @staticmethod
-    def get_by_name(db: Session, name: str) -> Optional[BebidaDB]:
-        """Busca bebida por nombre (primera coincidencia)"""
+    def get_page(db: Session, after_id: int, limit: int) -> List[BebidaDB]:
+        """Obtiene una página de bebidas por keyset (id > after_id)"""
         return db.query(BebidaDB).filter(
-            BebidaDB.name.ilike(f"%{name}%")
-        ).first()
+            BebidaDB.id > after_id
+        ).order_by(BebidaDB.id).limit(limit).all()
+    
+    @staticmethod
+    def iter_all(
+        db: Session, after_id: int = 0, chunk_size: int = 500, limit: Optional[int] = None
+    ) -> Iterator[BebidaDB]:
+        """Recorre las bebidas en orden de id leyendo por bloques, hasta limit si se da"""
+        stmt = select(BebidaDB).where(
+            BebidaDB.id > after_id
+        ).order_by(BebidaDB.id).limit(limit).execution_options(yield_per=chunk_size)
+        yield from db.scalars(stmt)
+    
+    @staticmethod
+    def get_names(db: Session) -> List[str]:
+        """Nombres normalizados del menú, sin cargar las filas completas"""
+        return list(db.scalars(select(BebidaDB.normalized_name).distinct()))
+    
+    @staticmethod
+    def get_by_name(db: Session, name: str) -> Optional[BebidaDB]:
+        """Busca bebida por nombre (la coincidencia más relevante)"""
+        resultados = BebidaRepository.search(db, normalize_name(name), 1)
+        return resultados[0] if resultados else None
+    
+    @staticmethod
+    def search(db: Session, query: str, limit: int) -> List[BebidaDB]:
+        """Busca por subcadena del nombre: exacto, luego prefijo, luego subcadena"""
+        return list(db.scalars(search_statement(query, limit)).all())
     
     @staticmethod
     def get_by_name_and_size(db: Session, name: str, size: str) -> Optional[BebidaDB]:
         """Busca bebida por nombre y tamaño exactos"""
         return db.query(BebidaDB).filter(
-            BebidaDB.name.ilike(name),
+            BebidaDB.normalized_name == normalize_name(name),
             BebidaDB.size == size.lower()
         ).first()
     
     @staticmethod
-    def create(db: Session, bebida: BebidaCreate) -> BebidaDB:
-        """Crea una nueva bebida"""
-        db_bebida = BebidaDB(
-            name=bebida.name,
-            size=bebida.size,
-            price=bebida.price
+    def get_many_by_name_and_size(
+        db: Session, pairs: Sequence[Tuple[str, str]]
+    ) -> List[BebidaDB]:
+        """Busca varias bebidas por (nombre, tamaño) en una sola consulta"""
+        keys = {(normalize_name(name), size.lower()) for name, size in pairs}
+        if not keys:
+            return []
+        return db.query(BebidaDB).filter(
+            tuple_(BebidaDB.normalized_name, BebidaDB.size).in_(keys)
+        ).all()
+    
+    @staticmethod
+    def create(db: Session, bebida: BebidaCreate) -> Optional[BebidaDB]:
+        """Crea una nueva bebida; None si ya existe ese nombre y tamaño"""
+        stmt = dialect_insert(db.get_bind().dialect.name)(BebidaDB).values(
+            **bebida_row(bebida)
+        ).on_conflict_do_nothing(
+            index_elements=["normalized_name", "size"]
+        ).returning(BebidaDB)
+        db_bebida: Optional[BebidaDB] = db.scalars(stmt).first()
+        if db_bebida is not None:
+            BebidaRepository._record_changes(db, [db_bebida.id], CHANGE_UPSERT)
+        db.commit()
+        return db_bebida
+    
+    @staticmethod
+    def upsert(db: Session, bebida: BebidaCreate) -> BebidaDB:
+        """Crea la bebida o actualiza su precio en una sola sentencia"""
+        stmt = dialect_insert(db.get_bind().dialect.name)(BebidaDB).values(
+            **bebida_row(bebida)
         )
-        db.add(db_bebida)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["normalized_name", "size"],
+            set_={
+                "name": stmt.excluded.name,
+                "price": stmt.excluded.price,
+                "updated_at": func.now(),
+            }
+        ).returning(BebidaDB)
+        db_bebida: BebidaDB = db.scalars(
+            stmt, execution_options={"populate_existing": True}
+        ).one()
+        BebidaRepository._record_changes(db, [db_bebida.id], CHANGE_UPSERT)
         db.commit()
-        db.refresh(db_bebida)
         return db_bebida
     
+    @staticmethod
+    def bulk_create(db: Session, bebidas: Sequence[BebidaCreate]) -> List[BebidaBulkResult]:
+        """Inserta un lote en una transacción, omitiendo duplicados"""
+        keys = [(normalize_name(bebida.name), bebida.size) for bebida in bebidas]
+        results = []
+        nuevas: Dict[Tuple[str, str], BebidaBulkResult] = {}
+        for index, (bebida, key) in enumerate(zip(bebidas, keys)):
+            result = BebidaBulkResult(
+                index=index, name=bebida.name, size=bebida.size, status="skipped"
+            )
+            if key in nuevas:
+                result.reason = "Duplicada en el lote"
+            else:
+                nuevas[key] = result
+            results.append(result)
+
+        if nuevas:
+            rows = [bebida_row(bebidas[r.index]) for r in nuevas.values()]
+            for bebida_id, normalized_name, size in BebidaRepository._insert_rows(db, rows):
+                result = nuevas[(normalized_name, size)]
+                result.status = "inserted"
+                result.id = bebida_id
+            for result in nuevas.values():
+                if result.id is None:
+                    result.reason = "Ya existe en el menú"
+            BebidaRepository._record_changes(
+                db, [r.id for r in nuevas.values() if r.id is not None], CHANGE_UPSERT
+            )
+        db.commit()
+        return results
+    
+    @staticmethod
+    def _insert_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+        """INSERT multi-fila sin duplicados (COPY a una tabla temporal en PostgreSQL)"""
+        dialect_name = db.get_bind().dialect.name
+        if dialect_name != "postgresql":
+            stmt = dialect_insert(dialect_name)(BebidaDB).on_conflict_do_nothing(
+                index_elements=["normalized_name", "size"]
+            ).returning(BebidaDB.id, BebidaDB.normalized_name, BebidaDB.size)
+            return [tuple(row) for row in db.execute(stmt, rows)]
+
+        columns = ("name", "normalized_name", "size", "price")
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(tuple(r[c] for c in columns) for r in rows)
+        buffer.seek(0)
+        db.execute(text(
+            "CREATE TEMP TABLE bebidas_staging "
+            "(name varchar(100), normalized_name varchar(100), "
+            "size varchar(20), price double precision) "
+            "ON COMMIT DROP"
+        ))
+        # Solo el COPY va por el cursor crudo; el resto pasa por los eventos del motor
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY bebidas_staging (name, normalized_name, size, price) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+        result = db.execute(text(
+            "INSERT INTO bebidas (name, normalized_name, size, price) "
+            "SELECT name, normalized_name, size, price FROM bebidas_staging "
+            "ON CONFLICT (normalized_name, size) DO NOTHING "
+            "RETURNING id, normalized_name, size"
+        ))
+        return [tuple(row) for row in result]
+    
+    @staticmethod
+    @coalesced
+    def count(db: Session) -> int:
+        """Cantidad de bebidas en el menú"""
+        return db.scalar(select(func.count()).select_from(BebidaDB)) or 0
+    
     @staticmethod
     def delete_by_id(db: Session, bebida_id: int) -> bool:
         """Elimina bebida por ID"""
         bebida = db.query(BebidaDB).filter(BebidaDB.id == bebida_id).first()
         if bebida:
             db.delete(bebida)
+            BebidaRepository._record_changes(db, [bebida_id], CHANGE_DELETE)
             db.commit()
             return True
         return False
     
+    @staticmethod
+    def _record_changes(db: Session, bebida_ids: Sequence[int], operation: str) -> None:
+        """Anota los cambios en la misma transacción de la escritura"""
+        if not bebida_ids:
+            return
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(CHANGE_LOG_LOCK)
+            # Se entrega al confirmar la transacción y se descarta si hay rollback
+            db.execute(CHANGE_NOTIFY, {
+                "channel": CHANGE_CHANNEL,
+                "payload": change_notification(bebida_ids, operation),
+            })
+        db.execute(insert(BebidaCambioDB), change_rows(bebida_ids, operation))
+    
+    @staticmethod
+    def current_version(db: Session) -> int:
+        """Última versión del registro de cambios"""
+        return db.scalar(select(func.max(BebidaCambioDB.version))) or 0
+    
+    @staticmethod
+    def last_change(db: Session) -> Tuple[int, Optional[datetime]]:
+        """Versión y fecha del último cambio del menú, iguales en todos los workers"""
+        version, changed_at = db.execute(
+            select(func.max(BebidaCambioDB.version), func.max(BebidaCambioDB.changed_at))
+        ).one()
+        return version or 0, changed_at
+    
+    @staticmethod
+    def get_change_log(
+        db: Session, after: int, limit: int
+    ) -> List[Tuple[int, str, int, Optional[BebidaDB]]]:
+        """Entradas del registro posteriores a after, en orden, con la fila vigente"""
+        stmt = select(
+            BebidaCambioDB.version, BebidaCambioDB.operation, BebidaCambioDB.bebida_id, BebidaDB
+        ).outerjoin(
+            BebidaDB, BebidaDB.id == BebidaCambioDB.bebida_id
+        ).where(
+            BebidaCambioDB.version > after
+        ).order_by(BebidaCambioDB.version).limit(limit)
+        return [tuple(row) for row in db.execute(stmt)]  # type: ignore[misc]
+
+    @staticmethod
+    def get_changes_since(db: Session, since: int) -> BebidaChanges:
+        """Filas modificadas y borradas después de la versión since"""
+        version = BebidaRepository.current_version(db)
+        if since == 0 or since > version:
+            # Réplica nueva o de otra base: se envía el menú completo
+            return BebidaChanges(
+                since=since,
+                version=version,
+                full_resync=True,
+                upserts=[Bebida.model_validate(b) for b in BebidaRepository.get_all(db)],
+                deleted=[]
+            )
+
+        ultimas: Dict[int, str] = {}
+        for bebida_id, operation in db.execute(
+            select(BebidaCambioDB.bebida_id, BebidaCambioDB.operation).where(
+                BebidaCambioDB.version > since,
+                BebidaCambioDB.version <= version
+            ).order_by(BebidaCambioDB.version)
+        ):
+            ultimas[bebida_id] = operation
+
+        upsert_ids = [i for i, op in ultimas.items() if op == CHANGE_UPSERT]
+        upserts = db.query(BebidaDB).filter(
+            BebidaDB.id.in_(upsert_ids)
+        ).order_by(BebidaDB.id).all() if upsert_ids else []
+        return BebidaChanges(
+            since=since,
+            version=version,
+            upserts=[Bebida.model_validate(b) for b in upserts],
+            deleted=sorted(i for i, op in ultimas.items() if op == CHANGE_DELETE)
+        )
+    
     @staticmethod
     def exists_by_name_and_size(db: Session, name: str, size: str) -> bool:
         """Verifica si existe una bebida con ese nombre y tamaño"""
-        return db.query(BebidaDB).filter(
-            BebidaDB.name.ilike(name),
-            BebidaDB.size == size.lower()
-        ).first() is not None
\ No newline at end of file
+        return BebidaRepository.get_by_name_and_size(db, name, size) is not None
+
+
+class AsyncBebidaRepository:
+    """Variante asíncrona del repositorio de bebidas (AsyncSession)"""
+
+    @staticmethod
+    async def get_all(db: AsyncSession) -> List[BebidaDB]:
+        """Obtiene todas las bebidas"""
+        result = await db.execute(select(BebidaDB))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_by_name(db: AsyncSession, name: str) -> Optional[BebidaDB]:
+        """Busca bebida por nombre (la coincidencia más relevante)"""
+        result = await db.execute(search_statement(normalize_name(name), 1))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_by_name_and_size(
+        db: AsyncSession, name: str, size: str
+    ) -> Optional[BebidaDB]:
+        """Busca bebida por nombre y tamaño exactos"""
+        result = await db.execute(
+            select(BebidaDB).where(
+                BebidaDB.normalized_name == normalize_name(name),
+                BebidaDB.size == size.lower()
+            ).limit(1)
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_many_by_name_and_size(
+        db: AsyncSession, pairs: Sequence[Tuple[str, str]]
+    ) -> List[BebidaDB]:
+        """Busca varias bebidas por (nombre, tamaño) en una sola consulta"""
+        keys = {(normalize_name(name), size.lower()) for name, size in pairs}
+        if not keys:
+            return []
+        result = await db.execute(
+            select(BebidaDB).where(
+                tuple_(BebidaDB.normalized_name, BebidaDB.size).in_(keys)
+            )
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def create(db: AsyncSession, bebida: BebidaCreate) -> Optional[BebidaDB]:
+        """Crea una nueva bebida; None si ya existe ese nombre y tamaño"""
+        stmt = dialect_insert(db.get_bind().dialect.name)(BebidaDB).values(
+            **bebida_row(bebida)
+        ).on_conflict_do_nothing(
+            index_elements=["normalized_name", "size"]
+        ).returning(BebidaDB)
+        db_bebida: Optional[BebidaDB] = (await db.scalars(stmt)).first()
+        if db_bebida is not None:
+            await AsyncBebidaRepository._record_changes(db, [db_bebida.id], CHANGE_UPSERT)
+        await db.commit()
+        return db_bebida
+
+    @staticmethod
+    async def delete_by_id(db: AsyncSession, bebida_id: int) -> bool:
+        """Elimina bebida por ID"""
+        bebida = await db.get(BebidaDB, bebida_id)
+        if bebida:
+            await db.delete(bebida)
+            await AsyncBebidaRepository._record_changes(db, [bebida_id], CHANGE_DELETE)
+            await db.commit()
+            return True
+        return False
+
+    @staticmethod
+    async def _record_changes(
+        db: AsyncSession, bebida_ids: Sequence[int], operation: str
+    ) -> None:
+        """Anota los cambios en la misma transacción de la escritura"""
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(CHANGE_LOG_LOCK)
+            await db.execute(CHANGE_NOTIFY, {
+                "channel": CHANGE_CHANNEL,
+                "payload": change_notification(bebida_ids, operation),
+            })
+        await db.execute(insert(BebidaCambioDB), change_rows(bebida_ids, operation))
+
+    @staticmethod
+    async def current_version(db: AsyncSession) -> int:
+        """Última versión del registro de cambios"""
+        return await db.scalar(select(func.max(BebidaCambioDB.version))) or 0
+
+    @staticmethod
+    async def last_changed_at(db: AsyncSession) -> Optional[datetime]:
+        """Fecha del último cambio del menú"""
+        return await db.scalar(select(func.max(BebidaCambioDB.changed_at)))
+
+    @staticmethod
+    async def exists_by_name_and_size(db: AsyncSession, name: str, size: str) -> bool:
+        """Verifica si existe una bebida con ese nombre y tamaño"""
+        return await AsyncBebidaRepository.get_by_name_and_size(db, name, size) is not None
@@ -0,0 +1,141 @@
+"""
+Invalidación de cachés entre workers
+En PostgreSQL cada worker escucha el canal NOTIFY de las escrituras; con otros
+motores (SQLite en tests) se consulta periódicamente la versión del registro de cambios.
+En ambos casos el aviso solo dispara la lectura del registro, así que un NOTIFY perdido
+durante una reconexión se recupera en la siguiente
+"""
+import json
+import logging
+import os
+import select
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from .models import CHANGE_CHANNEL, BebidaRepository
+
+logger = logging.getLogger(__name__)
+
+CACHE_SYNC_ENABLED = os.getenv("CACHE_SYNC_ENABLED", "true").lower() == "true"
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "1.0"))
+
+ChangeHandler = Callable[[Session, Dict[str, Any]], None]
+
+
+class ChangeListener:
+    """Hilo de fondo que avisa al worker de los cambios hechos por otros procesos"""
+
+    def __init__(
+        self, engine: Engine, on_change: ChangeHandler, interval: float = CACHE_SYNC_INTERVAL
+    ) -> None:
+        self.engine = engine
+        self.on_change = on_change
+        self.interval = interval
+        self.mode = "notify" if engine.dialect.name == "postgresql" else "poll"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_version: Optional[int] = None
+        # Tras un error pudo perderse algún aviso: se relee el registro al recuperarse
+        self._missed = False
+        self.notifications = 0
+        self.reconnects = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="bebidas-change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.mode == "notify":
+                    self._listen()
+                else:
+                    self.poll_once()
+                    self._stop.wait(self.interval)
+            except Exception:
+                logger.exception("Error en el listener de cambios del menú")
+                self.reconnects += 1
+                self._missed = True
+                self._stop.wait(self.interval)
+
+    @contextmanager
+    def _connect(self) -> Iterator[Any]:
+        """Conexión propia del driver para LISTEN, fuera del pool de la aplicación"""
+        listen_engine = create_engine(self.engine.url, poolclass=NullPool)
+        raw = listen_engine.raw_connection()
+        try:
+            yield raw.driver_connection
+        finally:
+            raw.close()
+            listen_engine.dispose()
+
+    def _listen(self) -> None:
+        with self._connect() as connection:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+            if self._missed:
+                # Ya escuchando: lo que se escribió durante el corte está en el registro
+                self._dispatch({})
+                self._missed = False
+            while not self._stop.is_set():
+                if select.select([connection], [], [], self.interval) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    self.handle_payload(notify.payload)
+
+    def handle_payload(self, payload: str) -> None:
+        """Procesa un NOTIFY, ignorando los que emitió este mismo proceso"""
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            change = {}
+        if change.get("pid") == os.getpid():
+            return
+        change.pop("pid", None)
+        self._dispatch(change)
+
+    def poll_once(self) -> bool:
+        """Compara la versión del registro de cambios con la última vista"""
+        with Session(self.engine) as db:
+            version = BebidaRepository.current_version(db)
+        previous = self._last_version
+        if previous is None or (version == previous and not self._missed):
+            self._last_version = version
+            return False
+        self._dispatch({"version": version})
+        self._last_version = version
+        self._missed = False
+        return True
+
+    def _dispatch(self, change: Dict[str, Any]) -> None:
+        self.notifications += 1
+        with Session(self.engine) as db:
+            self.on_change(db, change)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,241 @@
+"""
+Perfilado opcional por petición con cProfile
+Se activa con PROFILING_ENABLED; solo se perfilan las peticiones con el header de
+confianza o una fracción muestreada, y cada perfil se guarda en PROFILE_DIR
+Las rutas /debug que sirven los perfiles exigen ese mismo token
+"""
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import anyio
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import route_template
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/bebidas-profiles")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile-token").lower()
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP = 60
+
+PROFILE_ID = re.compile(r"^[0-9]+-[A-Z]+-[\w.-]+$")
+
+
+class RequestProfile:
+    """Perfil de una petición; puede sumar tramos de varios hilos"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stats: Optional[pstats.Stats] = None
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+
+active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+
+# cProfile no admite dos perfiles activos a la vez: uno anidado corta al primero.
+# Hasta 3.11 el perfil es del hilo que lo activa; desde 3.12 (sys.monitoring) es global
+# al intérprete, ve todos los hilos y un segundo enable() falla
+PROFILER_PER_THREAD = sys.version_info < (3, 12)
+_profiler_lock = threading.Lock()
+_profiler_thread = threading.local()
+
+
+def _acquire_profiler() -> bool:
+    if PROFILER_PER_THREAD:
+        if getattr(_profiler_thread, "busy", False):
+            return False
+        _profiler_thread.busy = True
+        return True
+    return _profiler_lock.acquire(blocking=False)
+
+
+def _release_profiler() -> None:
+    if PROFILER_PER_THREAD:
+        _profiler_thread.busy = False
+    else:
+        _profiler_lock.release()
+
+
+@contextmanager
+def _profiling(request_profile: RequestProfile) -> Iterator[None]:
+    """Perfila el bloque salvo que ya haya otro perfil activo, que sigue intacto"""
+    if not _acquire_profiler():
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        _release_profiler()
+        request_profile.add(profile)
+
+
+def profiled(call: Callable[..., Any]) -> Callable[..., Any]:
+    """Envuelve el endpoint para perfilarlo en el hilo donde realmente corre"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            request_profile = active_profile.get()
+            if request_profile is None:
+                return await call(*args, **kwargs)
+            # En el event loop el perfil también ve a las tareas que se intercalan
+            with _profiling(request_profile):
+                return await call(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        request_profile = active_profile.get()
+        if request_profile is None:
+            return call(*args, **kwargs)
+        # Las rutas sync corren en el threadpool: cProfile solo ve el hilo que lo activa
+        with _profiling(request_profile):
+            return call(*args, **kwargs)
+    return wrapper
+
+
+def require_profile_token(request: Request) -> None:
+    """Exige el token de perfilado; sin PROFILE_TOKEN las rutas quedan cerradas"""
+    token = request.headers.get(PROFILE_HEADER, "")
+    if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token de perfilado inválido"
+        )
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute cuyo handler se perfila cuando la petición fue elegida
+
+    El handler completo (lectura del body, dependencias, validación y serialización)
+    corre en el event loop; un endpoint sync corre en el threadpool y se perfila
+    además en su hilo
+    """
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+        if call is not None and not asyncio.iscoroutinefunction(call):
+            self.dependant.call = profiled(call)
+        return profiled(super().get_route_handler())
+
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", route).strip("_") or "root"
+
+
+class ProfileStore:
+    """Directorio con un .prof (cProfile) y un .txt (resumen) por petición"""
+
+    def __init__(self, directory: str = PROFILE_DIR) -> None:
+        self.directory = directory
+
+    def save(self, profile_id: str, stats: pstats.Stats, elapsed: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile_id)
+        stats.dump_stats(f"{base}.prof")
+        summary = io.StringIO()
+        summary.write(f"# {profile_id} {elapsed * 1000:.2f} ms\n")
+        report = pstats.Stats(f"{base}.prof", stream=summary)
+        report.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        with open(f"{base}.txt", "w", encoding="utf-8") as file:
+            file.write(summary.getvalue())
+
+    def index(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            profile_id, ext = os.path.splitext(filename)
+            if ext != ".prof" or not PROFILE_ID.match(profile_id):
+                continue
+            created_us, method, route = profile_id.split("-", 2)
+            profiles.append({
+                "id": profile_id,
+                "method": method,
+                "route": route,
+                "created_at": int(created_us) / 1_000_000,
+                "bytes": os.path.getsize(os.path.join(self.directory, filename)),
+                "summary": f"/debug/profiles/{profile_id}",
+            })
+        return profiles
+
+    def summary(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.txt")
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Elige las peticiones a perfilar y guarda su perfil al terminar"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore = profile_store,
+        header: str = PROFILE_HEADER,
+        token: str = PROFILE_TOKEN,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.header = header.lower().encode("latin-1")
+        self.token = token
+        self.sample_rate = sample_rate
+
+    def should_profile(self, scope: Scope) -> bool:
+        if self.token:
+            for name, value in scope.get("headers", []):
+                if name == self.header:
+                    return hmac.compare_digest(value.decode("latin-1"), self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_profile = RequestProfile()
+        token = active_profile.set(request_profile)
+        start = time.perf_counter()
+        created_us = time.time_ns() // 1000
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            active_profile.reset(token)
+        elapsed = time.perf_counter() - start
+        if request_profile.stats is not None:
+            profile_id = f"{created_us}-{scope['method']}-{_slug(route_template(scope))}"
+            await anyio.to_thread.run_sync(
+                self.store.save, profile_id, request_profile.stats, elapsed
+            )
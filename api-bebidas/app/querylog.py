@@ -0,0 +1,127 @@
+"""
+Registro de consultas lentas y muestreo de SQL
+Reemplaza echo=True: solo se escriben las consultas sobre el umbral y una muestra
+del resto, y se mantiene en memoria la tabla de las sentencias más lentas
+La duración es la que ya mide metrics en sus eventos del motor
+"""
+import logging
+import os
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+from .metrics import current_request, query_observers, route_template
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SQL_LOG_SAMPLE_RATE = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0"))
+SLOW_QUERY_TOP = int(os.getenv("SLOW_QUERY_TOP", "20"))
+# El registro siempre mide; esto solo decide si se monta /debug/slow-queries
+SLOW_QUERIES_ENDPOINT = os.getenv("SLOW_QUERIES_ENDPOINT", "false").lower() == "true"
+STATEMENT_MAX_CHARS = 2000
+
+
+def current_route() -> Optional[str]:
+    """Ruta de la petición que ejecuta la consulta, si la hay"""
+    stats = current_request.get()
+    if stats is None or stats.scope is None:
+        return None
+    return f"{stats.scope['method']} {route_template(stats.scope)}"
+
+
+class QueryLog:
+    """Umbral, muestreo y top-N de las sentencias más lentas"""
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        sample_rate: float = SQL_LOG_SAMPLE_RATE,
+        top_n: int = SLOW_QUERY_TOP,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._slowest: Dict[str, Dict[str, Any]] = {}
+        self.slow_count = 0
+        self.sampled_count = 0
+        # Menor max_ms de la tabla llena; lo que no lo supere no puede entrar
+        self._floor_ms = -1.0
+
+    def record(self, statement: str, elapsed_ms: float, route: Optional[str] = None) -> None:
+        """Registra la consulta; sin route se toma la de la petición en curso
+
+        Las consultas rápidas, no muestreadas y que no entran en la tabla se descartan
+        antes de normalizar o tomar el lock, así que count y avg_ms de la tabla solo
+        cuentan las ejecuciones que superaron su piso
+        """
+        slow = elapsed_ms >= self.threshold_ms
+        sampled = not slow and self.sample_rate > 0 and random.random() < self.sample_rate
+        if not slow and not sampled and elapsed_ms <= self._floor_ms:
+            return
+        statement = " ".join(statement.split())[:STATEMENT_MAX_CHARS]
+        if route is None:
+            route = current_route()
+        if slow:
+            self.slow_count += 1
+            logger.warning("Consulta lenta %.1f ms [%s] %s", elapsed_ms, route or "-", statement)
+        elif sampled:
+            self.sampled_count += 1
+            logger.info("SQL %.1f ms [%s] %s", elapsed_ms, route or "-", statement)
+        self._track(statement, elapsed_ms, route)
+
+    def _track(self, statement: str, elapsed_ms: float, route: Optional[str]) -> None:
+        with self._lock:
+            entry = self._slowest.get(statement)
+            if entry is None:
+                if len(self._slowest) >= self.top_n:
+                    fastest = min(self._slowest, key=lambda s: self._slowest[s]["max_ms"])
+                    if self._slowest[fastest]["max_ms"] >= elapsed_ms:
+                        return
+                    del self._slowest[fastest]
+                entry = self._slowest[statement] = {
+                    "statement": statement, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "route": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            if elapsed_ms >= entry["max_ms"]:
+                entry["max_ms"] = elapsed_ms
+                entry["route"] = route
+            if len(self._slowest) >= self.top_n:
+                self._floor_ms = min(e["max_ms"] for e in self._slowest.values())
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [dict(entry) for entry in self._slowest.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return sorted(entries, key=lambda e: e["max_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._floor_ms = -1.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "sample_rate": self.sample_rate,
+            "top_n": self.top_n,
+            "slow_count": self.slow_count,
+            "sampled_count": self.sampled_count,
+            "statements": self.slowest(),
+        }
+
+
+query_log = QueryLog()
+
+
+def _observe_query(statement: str, elapsed: float) -> None:
+    query_log.record(statement, elapsed * 1000)
+
+
+query_observers.append(_observe_query)
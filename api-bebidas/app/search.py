@@ -0,0 +1,203 @@
+"""
+Búsqueda de bebidas por nombre
+PostgreSQL usa el índice trigram (pg_trgm); el resto de motores un índice de
+n-gramas en memoria que se reconstruye cuando cambia la versión del menú
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .bloom import BloomFilter, TTLSet
+from .cache import MenuPayload, load_menu, menu_cache
+from .models import Bebida, BebidaRepository, normalize_name
+
+NGRAM_SIZE = 3
+NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "10000"))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "60"))
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """N-gramas de un texto ya normalizado"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def match_rank(name: str, query: str) -> int:
+    """0 = exacto, 1 = prefijo, 2 = subcadena"""
+    if name == query:
+        return 0
+    if name.startswith(query):
+        return 1
+    return 2
+
+
+class NameSearchIndex:
+    """Índice invertido de n-gramas sobre los nombres del menú"""
+
+    def __init__(self, n: int = NGRAM_SIZE) -> None:
+        self.n = n
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._rows: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def build(self, rows: Iterable[Dict[str, Any]], version: Optional[int] = None) -> None:
+        """Reconstruye el índice a partir de bebidas serializadas"""
+        indexed: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        postings: Dict[str, Set[int]] = {}
+        for row in rows:
+            name = normalize_name(row["name"])
+            indexed[row["id"]] = (name, row)
+            for gram in ngrams(name, self.n):
+                postings.setdefault(gram, set()).add(row["id"])
+        # Se reemplaza todo de una vez para que las lecturas nunca vean un índice a medias
+        self._rows, self._postings, self._version = indexed, postings, version
+
+    def ensure(self, version: int, loader: Callable[[], MenuPayload]) -> None:
+        """Reconstruye el índice si quedó atrás de la versión del menú"""
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version != version:
+                self.build(loader(), version)
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Bebidas cuyo nombre contiene la consulta, ordenadas por relevancia"""
+        query = normalize_name(query)
+        if not query:
+            return []
+        rows, postings = self._rows, self._postings
+
+        if len(query) < self.n:
+            candidates: Iterable[int] = rows.keys()
+        else:
+            grams = sorted(ngrams(query, self.n), key=lambda g: len(postings.get(g, ())))
+            if not grams or grams[0] not in postings:
+                return []
+            candidate_set = set(postings[grams[0]])
+            for gram in grams[1:]:
+                candidate_set &= postings.get(gram, set())
+                if not candidate_set:
+                    return []
+            candidates = candidate_set
+
+        matches = []
+        for bebida_id in candidates:
+            name, row = rows[bebida_id]
+            if query in name:
+                matches.append((match_rank(name, query), len(name), name, bebida_id, row))
+        matches.sort(key=lambda m: m[:4])
+        return [m[4] for m in matches[:limit]]
+
+
+name_index = NameSearchIndex()
+
+
+class UnknownNameFilter:
+    """Descarta búsquedas que no pueden coincidir con ningún nombre del menú
+
+    El filtro de Bloom guarda los nombres y sus n-gramas: si falta alguno de los
+    n-gramas de la consulta, ningún nombre la contiene. Las demás búsquedas fallidas
+    quedan en una caché negativa con TTL hasta la próxima escritura
+    """
+
+    def __init__(
+        self,
+        n: int = NGRAM_SIZE,
+        max_entries: int = NEGATIVE_CACHE_SIZE,
+        ttl: float = NEGATIVE_CACHE_TTL,
+    ) -> None:
+        self.n = n
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._bloom: Optional[BloomFilter] = None
+        self.negative = TTLSet(max_entries, ttl)
+        self.bloom_rejections = 0
+        self.negative_hits = 0
+
+    def build(self, names: Iterable[str], version: Optional[int] = None) -> None:
+        items: Set[str] = set()
+        for name in names:
+            name = normalize_name(name)
+            items.add(name)
+            items.update(ngrams(name, self.n))
+        self._bloom = BloomFilter.from_items(items)
+        self.negative.clear()
+        self._version = version
+
+    def ensure(self, version: int, loader: Callable[[], Iterable[str]]) -> None:
+        """Reconstruye el filtro si la versión del registro de cambios avanzó"""
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version != version:
+                self.build(loader(), version)
+
+    def reset(self) -> None:
+        """Olvida el filtro; la próxima búsqueda lo reconstruye"""
+        with self._lock:
+            self._bloom = None
+            self._version = None
+            self.negative.clear()
+
+    def is_definite_miss(self, query: str) -> bool:
+        """True si la búsqueda seguro no encuentra nada"""
+        query = normalize_name(query)
+        bloom = self._bloom
+        if bloom is None or not query or query in bloom:
+            return False
+        if len(query) >= self.n and any(gram not in bloom for gram in ngrams(query, self.n)):
+            self.bloom_rejections += 1
+            return True
+        if query in self.negative:
+            self.negative_hits += 1
+            return True
+        return False
+
+    def record_miss(self, query: str, version: int) -> None:
+        """Recuerda una búsqueda sin resultados si el menú no cambió mientras tanto"""
+        if self._version == version:
+            self.negative.add(normalize_name(query))
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            "version": self._version,
+            "bloom_bits": bloom.size if bloom is not None else 0,
+            "bloom_hashes": bloom.hashes if bloom is not None else 0,
+            "bloom_rejections": self.bloom_rejections,
+            "negative_hits": self.negative_hits,
+            "negative": self.negative.stats(),
+        }
+
+
+name_filter = UnknownNameFilter()
+
+
+def search_bebidas(
+    db: Session, query: str, limit: int, version: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Busca bebidas por subcadena del nombre con ranking exacto > prefijo > subcadena
+
+    version es la del registro de cambios si el llamador ya la consultó
+    """
+    if version is None:
+        version = BebidaRepository.current_version(db)
+    # El filtro solo necesita los nombres, no el menú serializado
+    name_filter.ensure(version, lambda: BebidaRepository.get_names(db))
+    if name_filter.is_definite_miss(query):
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        resultados = [
+            Bebida.model_validate(bebida).model_dump()
+            for bebida in BebidaRepository.search(db, normalize_name(query), limit)
+        ]
+    else:
+        name_index.ensure(menu_cache.version, lambda: load_menu(db).rows)
+        resultados = name_index.search(query, limit)
+
+    if not resultados:
+        name_filter.record_miss(query, version)
+    return resultados
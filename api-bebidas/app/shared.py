@@ -0,0 +1,154 @@
+"""
+Copia del menú serializado compartida entre los workers del host
+Un archivo mapeado en memoria (idealmente en /dev/shm) guarda el cuerpo JSON y sus
+variantes comprimidas; un seqlock en la cabecera permite detectar lecturas a medias
+Lo que se comparte es la consulta y la compresión de cada versión, no la memoria:
+cada worker copia los bytes a su caché local porque send() de ASGI necesita bytes
+y el archivo se reescribe en el mismo lugar con cada versión
+"""
+import math
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - solo POSIX
+    fcntl = None  # type: ignore[assignment]
+
+MENU_SHM_PATH = os.getenv("MENU_SHM_PATH", "")
+
+MAGIC = b"BMS1"
+# magic, seq, versión, last_modified, etag, largos de identity/gzip/br
+HEADER = struct.Struct("<4sQqd32sQQQ")
+SEQ_OFFSET = 4
+ENCODINGS = ("gzip", "br")
+
+
+class SharedEntry(NamedTuple):
+    """Menú leído de la memoria compartida"""
+    version: int
+    etag: str
+    last_modified: Optional[datetime]
+    body: bytes
+    encoded: Dict[str, bytes]
+
+
+class SharedMenuSnapshot:
+    """Menú serializado en un archivo mmap con cabecera versionada"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.reads = 0
+        self.writes = 0
+        self.stale = 0
+        self.torn = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Exclusión entre procesos para que solo un worker recargue el menú"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, version: int) -> Optional[SharedEntry]:
+        """Menú de la versión pedida, o None si falta, es viejo o se está escribiendo"""
+        try:
+            with open(self.path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size < HEADER.size:
+                    return None
+                with mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as view:
+                    return self._read_view(view, version)
+        except FileNotFoundError:
+            return None
+
+    def _read_view(self, view: mmap.mmap, version: int) -> Optional[SharedEntry]:
+        magic, seq, stored_version, modified, etag, *lengths = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or seq % 2:
+            self.torn += seq % 2
+            return None
+        if stored_version != version:
+            self.stale += 1
+            return None
+        end = HEADER.size + sum(lengths)
+        if end > len(view):
+            self.torn += 1
+            return None
+
+        payload = view[HEADER.size:end]
+        # Si el escritor empezó mientras copiábamos, la copia no sirve
+        if struct.unpack_from("<Q", view, SEQ_OFFSET)[0] != seq:
+            self.torn += 1
+            return None
+
+        self.reads += 1
+        body = payload[:lengths[0]]
+        encoded = {}
+        offset = lengths[0]
+        for encoding, length in zip(ENCODINGS, lengths[1:]):
+            if length:
+                encoded[encoding] = payload[offset:offset + length]
+            offset += length
+        return SharedEntry(
+            stored_version,
+            etag.rstrip(b"\0").decode("ascii"),
+            None if math.isnan(modified) else datetime.fromtimestamp(modified, timezone.utc),
+            body,
+            encoded,
+        )
+
+    def write(
+        self,
+        version: int,
+        etag: str,
+        last_modified: Optional[datetime],
+        body: bytes,
+        encoded: Dict[str, bytes],
+    ) -> None:
+        """Publica una versión del menú; llamar dentro de lock()"""
+        parts = [body] + [encoded.get(encoding, b"") for encoding in ENCODINGS]
+        needed = HEADER.size + sum(len(part) for part in parts)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # El archivo nunca se achica: un lector con un mapeo más grande no debe fallar
+            size = max(os.fstat(fd).st_size, needed)
+            os.ftruncate(fd, size)
+            with mmap.mmap(fd, size) as view:
+                seq = 0
+                if view[:4] == MAGIC:
+                    seq = struct.unpack_from("<Q", view, SEQ_OFFSET)[0]
+                seq += 1 + seq % 2
+                struct.pack_into("<Q", view, SEQ_OFFSET, seq)  # impar: escritura en curso
+
+                offset = HEADER.size
+                for part in parts:
+                    view[offset:offset + len(part)] = part
+                    offset += len(part)
+                HEADER.pack_into(
+                    view, 0, MAGIC, seq + 1, version,
+                    last_modified.timestamp() if last_modified is not None else math.nan,
+                    etag.encode("ascii"), *(len(part) for part in parts)
+                )
+                view.flush()
+        finally:
+            os.close(fd)
+        self.writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "reads": self.reads,
+            "writes": self.writes,
+            "stale": self.stale,
+            "torn": self.torn,
+        }
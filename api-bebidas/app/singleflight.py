@@ -0,0 +1,80 @@
+"""
+Agrupación de consultas idénticas concurrentes (single-flight)
+Si varias peticiones piden lo mismo a la vez, solo la primera consulta la base
+de datos y las demás esperan su resultado
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class Flight:
+    """Consulta en curso compartida por quienes llegan mientras tanto"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Ejecuta una sola vez cada clave con llamadas concurrentes pendientes"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        self._generation = 0
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Resultado de fn y si vino de la consulta de otro hilo"""
+        with self._lock:
+            key = (self._generation, key)
+            self.calls += 1
+            existing = self._flights.get(key)
+            leader = existing is None
+            if existing is None:
+                flight = self._flights[key] = Flight()
+                self.executions += 1
+            else:
+                flight = existing
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def forget(self) -> None:
+        """Tras una escritura, las consultas nuevas no se suman a las que ya estaban en curso"""
+        with self._lock:
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+                "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+repository_flights = SingleFlight()
@@ -0,0 +1,88 @@
+"""
+Benchmarks de los endpoints más usados, a través de la app ASGI completa
+"""
+import itertools
+
+import pytest
+from sqlalchemy import delete
+
+from app.events import invalidate_local_caches
+from app.models import BebidaDB
+
+COLD_ROUNDS = 5
+_secuencia = itertools.count()
+
+
+@pytest.mark.benchmark(group="get_menu")
+def bench_get_menu_cache(benchmark, client):
+    """Menú servido desde el snapshot ya codificado"""
+    client.get("/menu")
+    response = benchmark(client.get, "/menu", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="get_menu")
+def bench_get_menu_frio(benchmark, client):
+    """Menú reconstruido en cada ronda: consulta, validación, JSON y compresión"""
+    response = benchmark.pedantic(
+        client.get, args=("/menu",), setup=invalidate_local_caches,
+        rounds=COLD_ROUNDS, iterations=1
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="get_bebida_by_name")
+def bench_get_bebida_by_name(benchmark, client, catalog):
+    """Búsqueda por nombre con las cachés calientes"""
+    url = f"/menu/{catalog.popular}"
+    response = benchmark(client.get, url)
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="get_bebida_by_name")
+def bench_get_bebida_by_name_desconocida(benchmark, client):
+    """Nombre inexistente: el filtro de Bloom responde 404"""
+    response = benchmark(client.get, "/menu/Frappuccino")
+    assert response.status_code == 404
+
+
+@pytest.mark.benchmark(group="get_bebida_by_name")
+def bench_get_bebida_by_name_and_size(benchmark, client, catalog):
+    url = f"/menu/{catalog.popular}/{catalog.popular_size}"
+    response = benchmark(client.get, url)
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="create_bebida")
+def bench_create_bebida(benchmark, client):
+    """Alta de una bebida nueva por ronda (incluye invalidar las cachés)"""
+    def crear():
+        return client.post("/menu", json={
+            "name": f"Nueva {next(_secuencia)}", "size": "medium", "price": 3.0
+        })
+
+    response = benchmark(crear)
+    assert response.status_code == 201
+
+
+@pytest.mark.benchmark(group="seed_menu")
+def bench_seed_menu(benchmark, client, catalog):
+    """Seed completo: las 10 bebidas de ejemplo se insertan en cada ronda"""
+    ejemplos = ["latte", "espresso", "cappuccino", "americano", "mocha"]
+
+    def limpiar():
+        with catalog.engine.begin() as conn:
+            conn.execute(delete(BebidaDB).where(BebidaDB.normalized_name.in_(ejemplos)))
+
+    response = benchmark.pedantic(
+        client.post, args=("/menu/seed",), setup=limpiar, rounds=20, iterations=1
+    )
+    assert response.json()["message"] == "Menú inicializado con 10 bebidas"
+
+
+@pytest.mark.benchmark(group="seed_menu")
+def bench_seed_menu_existente(benchmark, client):
+    """Seed repetido: todas las filas chocan con el índice único"""
+    client.post("/menu/seed")
+    response = benchmark(client.post, "/menu/seed")
+    assert response.status_code == 201
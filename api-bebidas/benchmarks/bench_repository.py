@@ -0,0 +1,65 @@
+"""
+Benchmarks de BebidaRepository y de la validación Pydantic
+"""
+import pytest
+
+from app.models import Bebida, BebidaRepository, normalize_name
+
+
+@pytest.mark.benchmark(group="model_validate")
+def bench_model_validate(benchmark, db):
+    """Bebida.model_validate sobre todo el catálogo, como al armar el menú"""
+    bebidas = BebidaRepository.get_all(db)
+    resultado = benchmark(lambda: [Bebida.model_validate(b).model_dump() for b in bebidas])
+    assert len(resultado) == len(bebidas)
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_get_all(benchmark, db, catalog):
+    def leer():
+        db.expunge_all()
+        return BebidaRepository.get_all(db)
+
+    assert len(benchmark(leer)) == catalog.size
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_get_page(benchmark, db, catalog):
+    pagina = benchmark(BebidaRepository.get_page, db, catalog.size // 2, 100)
+    assert len(pagina) == min(100, catalog.size - catalog.size // 2)
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_search(benchmark, db, catalog):
+    """Búsqueda por subcadena en SQL (el camino de PostgreSQL, aquí sin pg_trgm)"""
+    resultados = benchmark(BebidaRepository.search, db, normalize_name(catalog.popular), 10)
+    assert resultados[0].name == catalog.popular
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_get_by_name_and_size(benchmark, db, catalog):
+    bebida = benchmark(
+        BebidaRepository.get_by_name_and_size, db, catalog.popular, catalog.popular_size
+    )
+    assert bebida is not None
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_get_many_by_name_and_size(benchmark, db, catalog):
+    """Lote de 50 pares resuelto con un solo IN de tuplas"""
+    pares = [
+        (name, ("small", "medium", "large")[i % 3])
+        for i, name in enumerate(catalog.names[:50])
+    ]
+    assert len(benchmark(BebidaRepository.get_many_by_name_and_size, db, pares)) == len(pares)
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_count(benchmark, db, catalog):
+    assert benchmark(BebidaRepository.count, db) == catalog.size
+
+
+@pytest.mark.benchmark(group="repository")
+def bench_get_changes_since(benchmark, db):
+    cambios = benchmark(BebidaRepository.get_changes_since, db, 0)
+    assert cambios.full_resync
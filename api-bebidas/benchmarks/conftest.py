@@ -0,0 +1,89 @@
+"""
+Fixtures de los benchmarks: catálogos de 10 a 100k bebidas en SQLite en memoria
+BENCH_SIZES permite elegir los tamaños (por ejemplo BENCH_SIZES=10,1000)
+"""
+import os
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.events import invalidate_local_caches
+from app.main import app
+from app.models import BebidaDB
+
+SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10,1000,100000").split(",")]
+TAMANOS = ("small", "medium", "large")
+
+
+@dataclass
+class Catalog:
+    """Base poblada con size bebidas de nombres conocidos"""
+    engine: Engine
+    size: int
+    names: List[str]
+
+    @property
+    def popular(self) -> str:
+        """Nombre a mitad del catálogo, para no favorecer el primer registro"""
+        return self.names[self.size // 2]
+
+    @property
+    def popular_size(self) -> str:
+        return TAMANOS[self.size // 2 % len(TAMANOS)]
+
+
+def catalog_rows(size: int) -> List[dict]:
+    return [
+        {
+            "name": f"Bebida {i:06d}",
+            "normalized_name": f"bebida {i:06d}",
+            "size": TAMANOS[i % len(TAMANOS)],
+            "price": round(2 + (i % 300) / 100, 2),
+        }
+        for i in range(size)
+    ]
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}")
+def catalog(request) -> Iterator[Catalog]:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    rows = catalog_rows(request.param)
+    with engine.begin() as conn:
+        conn.execute(insert(BebidaDB), rows)
+    yield Catalog(engine, request.param, [row["name"] for row in rows])
+    engine.dispose()
+
+
+@pytest.fixture
+def db(catalog: Catalog) -> Iterator[Session]:
+    session = Session(catalog.engine)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(catalog: Catalog) -> Iterator[TestClient]:
+    """Cliente de la app real contra el catálogo del benchmark"""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=catalog.engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    invalidate_local_caches()
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
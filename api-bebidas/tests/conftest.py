@@ -0,0 +1,71 @@
+"""
+Fixtures compartidas por los tests de la API
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.events import change_bus, invalidate_local_caches
+from app.main import app
+from app.search import name_filter
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Base PostgreSQL desechable para los tests marcados con postgres
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+
+def override_get_db():
+    """Override de la dependencia de base de datos para tests"""
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    """Configura la base de datos para cada test"""
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    invalidate_local_caches()
+    # Cada test parte de un registro de cambios vacío
+    change_bus.reset()
+    # El filtro va por versión del registro, que vuelve a empezar con la base
+    name_filter.reset()
+    yield
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def client():
+    """Cliente de prueba"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def postgres_engine():
+    """Motor contra TEST_POSTGRES_URL con el esquema recién creado"""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL no está definida")
+    pg_engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(bind=pg_engine)
+    Base.metadata.create_all(bind=pg_engine)
+    yield pg_engine
+    Base.metadata.drop_all(bind=pg_engine)
+    pg_engine.dispose()
@@ -0,0 +1,146 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.admission import (
+    ADMIN, READ, WRITE, AdmissionController, admission, default_max_concurrent,
+    parse_route_limits, route_priority,
+)
+from app.database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from app.main import app
+from app.metrics import REQUESTS_TOTAL
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class TestAdmissionController:
+    """Tests para los cupos y la cola de admisión"""
+
+    def test_prioridades(self):
+        assert route_priority("GET", "/menu/{name}") == READ
+        assert route_priority("POST", "/menu/quote") == READ
+        assert route_priority("POST", "/async/menu/lookup") == READ
+        assert route_priority("POST", "/menu") == WRITE
+        assert route_priority("POST", "/menu/seed") == ADMIN
+        assert parse_route_limits("POST /menu/seed=1, POST  /menu/bulk=2") == {
+            "POST /menu/seed": 1, "POST /menu/bulk": 2
+        }
+
+    def test_cupo_por_defecto(self):
+        """Test: el cupo sigue a las conexiones disponibles"""
+        assert default_max_concurrent("sqlite:///./bebidas.db") == 1
+        assert default_max_concurrent("postgresql://localhost/bebidas") == DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+    def test_cola_y_liberacion(self):
+        """Test: al liberar un cupo pasa la siguiente petición en espera"""
+        controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=5, route_limits={})
+
+        async def run():
+            assert await controller.acquire("GET /menu") is None
+            waiting = asyncio.ensure_future(controller.acquire("GET /menu"))
+            await settle()
+            assert controller.stats()["waiting"] == 1
+            controller.release("GET /menu")
+            assert await waiting is None
+            assert controller.stats()["active"] == 1
+
+        asyncio.run(run())
+
+    def test_lecturas_antes_que_admin(self):
+        controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=5, route_limits={})
+        order = []
+
+        async def request(key, priority):
+            assert await controller.acquire(key, priority) is None
+            order.append(key)
+            controller.release(key)
+
+        async def run():
+            await controller.acquire("POST /menu", WRITE)
+            tasks = [
+                asyncio.ensure_future(request("POST /menu/seed", ADMIN)),
+                asyncio.ensure_future(request("GET /menu", READ)),
+            ]
+            await settle()
+            controller.release("POST /menu")
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["GET /menu", "POST /menu/seed"]
+
+    def test_limite_por_ruta(self):
+        """Test: un seed en curso no bloquea las lecturas"""
+        controller = AdmissionController(
+            max_concurrent=4, queue_size=4, queue_timeout=0.05, route_limits={"POST /menu/seed": 1}
+        )
+
+        async def run():
+            assert await controller.acquire("POST /menu/seed", ADMIN) is None
+            assert await controller.acquire("GET /menu", READ) is None
+            assert await controller.acquire("POST /menu/seed", ADMIN) == "timeout"
+
+        asyncio.run(run())
+        assert controller.stats()["rejected"]["timeout"] == 1
+
+    def test_cola_llena(self):
+        """Test: con la cola llena una lectura desplaza a la escritura admin"""
+        controller = AdmissionController(max_concurrent=1, queue_size=1, queue_timeout=5, route_limits={})
+
+        async def run():
+            await controller.acquire("GET /menu", READ)
+            admin = asyncio.ensure_future(controller.acquire("POST /menu/seed", ADMIN))
+            await settle()
+            assert await controller.acquire("POST /menu/bulk", ADMIN) == "queue_full"
+            read = asyncio.ensure_future(controller.acquire("GET /menu", READ))
+            await settle()
+            assert await admin == "shed"
+            controller.release("GET /menu")
+            assert await read is None
+
+        asyncio.run(run())
+        assert controller.stats()["rejected"] == {"queue_full": 1, "timeout": 0, "shed": 1}
+
+    def test_cancelacion_libera_la_cola(self):
+        controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=5, route_limits={})
+
+        async def run():
+            await controller.acquire("GET /menu")
+            waiting = asyncio.ensure_future(controller.acquire("GET /menu"))
+            await settle()
+            waiting.cancel()
+            await settle()
+            assert controller.stats()["waiting"] == 0
+            controller.release("GET /menu")
+
+        asyncio.run(run())
+        assert controller.stats()["active"] == 0
+
+
+class TestAdmissionMiddleware:
+    """Tests para el 503 con Retry-After"""
+
+    def test_saturado_responde_503(self, monkeypatch):
+        monkeypatch.setattr(admission, "max_concurrent", 0)
+        monkeypatch.setattr(admission, "queue_size", 0)
+        before = REQUESTS_TOTAL.value(("GET", "/menu", "503"))
+        client = TestClient(app)
+
+        response = client.get("/menu")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert "saturado" in response.json()["detail"]
+        assert REQUESTS_TOTAL.value(("GET", "/menu", "503")) == before + 1
+
+        # Salud y métricas no ocupan cupo
+        assert client.get("/").status_code == 200
+        stats = client.get("/metrics/admission").json()
+        assert stats["rejected"]["queue_full"] >= 1
+
+    def test_libera_el_cupo(self):
+        client = TestClient(app)
+        assert client.post("/menu/seed").status_code == 201
+        assert client.get("/menu/Latte").status_code == 200
+        assert admission.stats()["active"] == 0
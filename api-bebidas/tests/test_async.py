@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.async_routes import router
+from app.cache import menu_cache
+from app.database import Base, get_async_db, to_async_url
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Cliente de prueba contra las rutas asíncronas con aiosqlite"""
+    url = f"sqlite:///{tmp_path / 'bebidas.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    menu_cache.invalidate()
+
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    test_app.dependency_overrides[get_async_db] = override_get_async_db
+    yield TestClient(test_app)
+    sync_engine.dispose()
+
+
+class TestAsyncMenu:
+    """Tests para las variantes asíncronas del menú"""
+
+    def test_to_async_url(self):
+        """Test: traducir URLs al driver asíncrono"""
+        assert to_async_url("postgresql://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+        assert to_async_url("postgresql+psycopg2://u@h/db") == "postgresql+asyncpg://u@h/db"
+        assert to_async_url("sqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+
+    def test_crear_y_listar(self, client):
+        """Test: crear una bebida y verla en el menú"""
+        response = client.post("/async/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        assert response.status_code == 201
+
+        menu = client.get("/async/menu").json()
+        assert [(b["name"], b["size"]) for b in menu] == [("Latte", "small")]
+        assert client.get("/async/menu/lat").json()["name"] == "Latte"
+        assert client.get("/async/menu/latte/small").json()["size"] == "small"
+        assert client.get("/async/menu/latte/large").status_code == 404
+
+    def test_menu_condicional(self, client):
+        """Test: /async/menu responde 304 si el ETag no cambió"""
+        client.post("/async/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        etag = client.get("/async/menu").headers["etag"]
+
+        response = client.get("/async/menu", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_no_duplicar_y_eliminar(self, client):
+        """Test: rechazar duplicados y eliminar por ID"""
+        bebida = {"name": "Mocha", "size": "large", "price": 4.75}
+        creada = client.post("/async/menu", json=bebida).json()
+        assert client.post("/async/menu", json=bebida).status_code == 400
+
+        assert client.delete(f"/async/menu/{creada['id']}").status_code == 204
+        assert client.delete(f"/async/menu/{creada['id']}").status_code == 404
+        assert client.get("/async/menu/Mocha").status_code == 404
+
+    def test_lookup(self, client):
+        """Test: resolver un lote con la sesión asíncrona"""
+        client.post("/async/menu", json={"name": "Espresso", "size": "small", "price": 2.0})
+        data = client.post("/async/menu/lookup", json={"items": [
+            {"name": "espresso", "size": "small"},
+            {"name": "espresso", "size": "large"},
+        ]}).json()
+        assert len(data["found"]) == 1
+        assert data["missing"] == [{"name": "espresso", "size": "large"}]
@@ -0,0 +1,82 @@
+import time
+
+from app.bloom import BloomFilter, TTLSet
+from app.search import UnknownNameFilter
+
+
+def filtro(*names):
+    name_filter = UnknownNameFilter(max_entries=2, ttl=60)
+    name_filter.build(names, version=1)
+    return name_filter
+
+
+class TestBloomFilter:
+    """Tests para el filtro de Bloom"""
+
+    def test_sin_falsos_negativos(self):
+        """Test: todo lo agregado se reporta como presente"""
+        items = [f"bebida {i}" for i in range(500)]
+        bloom = BloomFilter.from_items(items)
+        assert all(item in bloom for item in items)
+
+    def test_falsos_positivos_acotados(self):
+        """Test: la tasa de falsos positivos queda cerca de la configurada"""
+        bloom = BloomFilter.from_items((f"bebida {i}" for i in range(1000)), error_rate=0.01)
+        falsos = sum(f"otra {i}" in bloom for i in range(10000))
+        assert falsos < 300
+
+
+class TestTTLSet:
+    """Tests para la caché negativa"""
+
+    def test_expira(self):
+        entradas = TTLSet(max_entries=10, ttl=0.01)
+        entradas.add("lattte")
+        assert "lattte" in entradas
+        time.sleep(0.02)
+        assert "lattte" not in entradas
+
+    def test_acotada(self):
+        entradas = TTLSet(max_entries=2, ttl=60)
+        for key in ("a", "b", "c"):
+            entradas.add(key)
+        assert "a" not in entradas
+        assert len(entradas) == 2
+        assert entradas.stats()["evictions"] == 1
+
+
+class TestUnknownNameFilter:
+    """Tests para el descarte de nombres desconocidos"""
+
+    def test_subcadenas_de_nombres_conocidos_pasan(self):
+        """Test: nombres y subcadenas del menú nunca se descartan"""
+        name_filter = filtro("Latte", "Caramel Macchiato")
+        for query in ("Latte", "  LATTE ", "lat", "macchiato", "el ma", "la"):
+            assert not name_filter.is_definite_miss(query)
+
+    def test_nombre_inexistente_se_descarta(self):
+        """Test: un n-grama ausente basta para saber que no hay coincidencias"""
+        name_filter = filtro("Latte", "Mocha")
+        assert name_filter.is_definite_miss("Frappuccino")
+        assert name_filter.stats()["bloom_rejections"] == 1
+
+    def test_cache_negativa(self):
+        """Test: una búsqueda fallida que pasó el Bloom queda recordada"""
+        name_filter = filtro("Mocha", "Chamomile")
+        # Todos sus trigramas existen, pero ningún nombre la contiene
+        assert not name_filter.is_definite_miss("mochamo")
+        name_filter.record_miss("mochamo", version=1)
+        assert name_filter.is_definite_miss("mochamo")
+        assert name_filter.stats()["negative_hits"] == 1
+
+    def test_no_recuerda_fallos_de_una_version_vieja(self):
+        """Test: si el menú cambió durante la búsqueda, el fallo no se guarda"""
+        name_filter = filtro("Latte")
+        name_filter.record_miss("mochatte", version=0)
+        assert len(name_filter.negative) == 0
+
+    def test_reconstruir_limpia_la_cache_negativa(self):
+        name_filter = filtro("Mocha", "Chamomile")
+        name_filter.record_miss("mochamo", version=1)
+        name_filter.ensure(2, lambda: ["Mochamo"])
+        assert not name_filter.is_definite_miss("mochamo")
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.events import ChangeBus, event_stream, publish_changes
+from app.models import BebidaCreate, BebidaRepository
+
+
+class FakeRequest:
+    """Request que se desconecta tras cierto número de consultas"""
+
+    def __init__(self, checks: int = 100) -> None:
+        self.checks = checks
+
+    async def is_disconnected(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+async def collect(stream, count):
+    """Lee los primeros count mensajes del stream"""
+    messages = []
+    async for message in stream:
+        messages.append(message.decode())
+        if len(messages) == count:
+            break
+    await stream.aclose()
+    return messages
+
+
+class TestChangeBus:
+    """Tests para el bus de cambios del menú"""
+
+    def test_historial_para_reanudar(self):
+        """Test: los eventos posteriores a un id se recuperan del historial"""
+        bus = ChangeBus(history_size=3)
+        for i in range(1, 6):
+            bus.publish(i, "deleted", {"id": i})
+
+        assert [e.id for e in bus.events_after(3)] == [4, 5]
+        assert bus.events_after(5) == []
+        # El evento 2 ya salió del historial y el 9 no existe
+        assert bus.events_after(1) is None
+        assert bus.events_after(9) is None
+
+    def test_ids_con_huecos_y_repetidos(self):
+        """Test: los ids son versiones del registro; puede haber huecos y relecturas"""
+        bus = ChangeBus()
+        bus.reset(10)
+        assert bus.publish(12, "deleted", {"id": 1}) is not None
+        assert bus.publish(12, "deleted", {"id": 1}) is None
+        assert bus.publish(11, "deleted", {"id": 2}) is None
+        assert bus.publish(15, "deleted", {"id": 3}) is not None
+
+        assert [e.id for e in bus.events_after(10)] == [12, 15]
+        assert [e.id for e in bus.events_after(13)] == [15]
+        assert bus.events_after(9) is None
+
+    def test_stream_entrega_eventos_publicados(self):
+        """Test: un evento publicado desde otro hilo llega al stream"""
+        bus = ChangeBus()
+
+        async def run():
+            stream = event_stream(FakeRequest(), None, bus, heartbeat=1)
+            assert (await stream.__anext__()).startswith(b"retry:")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, bus.publish, 4, "deleted", {"id": 7})
+            return await collect(stream, 1)
+
+        assert asyncio.run(run()) == ['id: 4\nevent: deleted\ndata: {"id":7}\n\n']
+        assert bus.stats()["subscribers"] == 0
+
+    def test_stream_reanuda_desde_last_event_id(self):
+        """Test: al reconectar se reenvían los eventos perdidos"""
+        bus = ChangeBus()
+        for i in range(1, 4):
+            bus.publish(i, "deleted", {"id": i})
+
+        messages = asyncio.run(collect(event_stream(FakeRequest(), 1, bus, heartbeat=1), 3))
+        assert messages[1].startswith("id: 2\n")
+        assert messages[2].startswith("id: 3\n")
+
+    def test_stream_pide_resync_si_el_historial_no_alcanza(self):
+        """Test: sin historial suficiente el cliente recibe un evento resync"""
+        bus = ChangeBus(history_size=1)
+        for i in range(1, 4):
+            bus.publish(i, "deleted", {"id": i})
+
+        messages = asyncio.run(collect(event_stream(FakeRequest(), 0, bus, heartbeat=1), 2))
+        assert messages[1] == "id: 3\nevent: resync\ndata: {}\n\n"
+
+    def test_heartbeat(self):
+        """Test: sin cambios el stream envía comentarios de keep-alive"""
+        bus = ChangeBus()
+        messages = asyncio.run(collect(event_stream(FakeRequest(), None, bus, heartbeat=0.01), 2))
+        assert messages[1] == ": ping\n\n"
+
+    def test_consumidor_lento_se_corta(self):
+        """Test: si la cola del cliente se llena, recibe resync y se cierra"""
+        bus = ChangeBus(queue_size=2)
+
+        async def run():
+            stream = event_stream(FakeRequest(), None, bus, heartbeat=1)
+            await stream.__anext__()
+            for i in range(1, 6):
+                bus.publish(i, "deleted", {"id": i})
+            await asyncio.sleep(0)
+            return [m.decode() async for m in stream]
+
+        messages = asyncio.run(run())
+        assert [m.split("\n")[0] for m in messages] == ["id: 1", "id: 2", "id: 5"]
+        assert "event: resync" in messages[-1]
+        assert bus.stats()["dropped_subscribers"] == 1
+
+
+@pytest.fixture
+def log_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'eventos.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+class TestPublicacionDesdeRegistro:
+    """Tests para los eventos generados a partir de bebida_cambios"""
+
+    def test_eventos_con_version_y_fila(self, log_db):
+        """Test: cada entrada del registro es un evento con su versión como id"""
+        bus = ChangeBus()
+        latte = BebidaRepository.create(log_db, BebidaCreate(name="Latte", size="small", price=2.5))
+        BebidaRepository.create(log_db, BebidaCreate(name="Mocha", size="large", price=4.0))
+        BebidaRepository.delete_by_id(log_db, latte.id)
+
+        assert publish_changes(log_db, bus) == 3
+        eventos = bus.events_after(0)
+        assert [(e.id, e.type) for e in eventos] == [(1, "deleted"), (2, "upserted"), (3, "deleted")]
+        assert eventos[1].data["name"] == "Mocha"
+        assert eventos[2].data == {"id": latte.id}
+        # Releer el mismo tramo no duplica eventos
+        assert publish_changes(log_db, bus) == 0
+
+    def test_resync_si_el_historial_no_alcanza(self, log_db):
+        """Test: un lote más grande que el historial se anuncia como resync"""
+        bus = ChangeBus(history_size=2)
+        BebidaRepository.bulk_create(log_db, [
+            BebidaCreate(name=f"Bebida {i}", size="small", price=2.0) for i in range(3)
+        ])
+
+        publish_changes(log_db, bus)
+
+        assert bus.last_id == 3
+        assert bus.stats()["resyncs"] == 1
+        assert bus.events_after(0) is None
+        assert bus.events_after(3) == []
+
+    def test_resync_si_el_registro_retrocede(self, log_db):
+        bus = ChangeBus()
+        bus.reset(50)
+        publish_changes(log_db, bus)
+        assert bus.last_id == 0
+        assert bus.stats()["resyncs"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.loadgen import LoadResult, main, parse_mix, percentile, run_load
+from app.main import app
+
+
+class TestLoadGen:
+    """Tests para el generador de carga"""
+
+    def test_parse_mix(self):
+        assert parse_mix("name=85, menu=10,create=5") == {"name": 85.0, "menu": 10.0, "create": 5.0}
+        with pytest.raises(ValueError):
+            parse_mix("name=80,borrar=20")
+        with pytest.raises(ValueError):
+            parse_mix("name=0")
+
+    def test_percentil_rango_mas_cercano(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile(values, 100) == 100.0
+        assert percentile([], 95) == 0.0
+
+    def test_resumen_cuenta_errores(self):
+        result = LoadResult()
+        result.record("name", 0.010, 200)
+        result.record("name", 0.020, 404)
+        result.record("create", 0.030, 503)
+        result.record("create", 0.040, None)
+        result.elapsed = 2.0
+
+        summary = result.summary()
+        assert summary["requests"] == 4
+        assert summary["throughput_rps"] == 2.0
+        assert summary["errors"] == 2
+        assert summary["error_rate"] == 0.5
+        assert summary["latency_ms"]["max"] == 40.0
+        assert summary["by_operation"]["name"]["status_codes"] == {"200": 1, "404": 1}
+        assert summary["by_operation"]["create"]["status_codes"] == {"503": 1, "exception": 1}
+
+    def test_carga_en_proceso(self):
+        """Test: los clientes virtuales respetan el tope de peticiones"""
+        # Un solo cliente: la conexión única de SQLite en memoria no admite escrituras concurrentes
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post("/menu/seed")
+                return await run_load(
+                    client, clients=1, duration=30, mix=parse_mix("name=70,menu=20,create=10"),
+                    max_requests=40, seed=1
+                )
+
+        summary = asyncio.run(run()).summary()
+        assert summary["requests"] == 40
+        assert summary["errors"] == 0
+        assert summary["by_operation"]["name"]["status_codes"] == {
+            "200": summary["by_operation"]["name"]["requests"]
+        }
+        assert summary["latency_ms"]["p50"] <= summary["latency_ms"]["p99"]
+
+    def test_mezcla_invalida_en_cli(self, capsys):
+        assert main(["--mix", "delete=1"]) == 2
+        assert "desconocida" in capsys.readouterr().err
@@ -0,0 +1,58 @@
+import time
+
+from app.lru import LRUCache
+
+
+class TestLRUCache:
+    """Tests para la caché LRU con TTL"""
+
+    def test_desaloja_la_menos_usada(self):
+        """Test: al superar las entradas se descarta la menos usada recientemente"""
+        cache = LRUCache(max_entries=2, max_bytes=1000, ttl=60)
+        cache.put("a", 1, 10)
+        cache.put("b", 2, 10)
+        cache.get("a")
+        cache.put("c", 3, 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"]["capacity"] == 1
+
+    def test_limite_en_bytes(self):
+        """Test: el total de bytes nunca supera el máximo"""
+        cache = LRUCache(max_entries=100, max_bytes=25, ttl=60)
+        for key in "abc":
+            cache.put(key, key, 10)
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] == 20
+        assert stats["evictions"]["bytes"] == 1
+        assert cache.put("grande", "x", 26) is False
+
+    def test_ttl(self):
+        """Test: una entrada vencida cuenta como fallo y se desaloja"""
+        cache = LRUCache(max_entries=10, max_bytes=100, ttl=0.01)
+        cache.put("a", 1, 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.stats()["evictions"]["expired"] == 1
+
+    def test_clear_descarta_cargas_en_curso(self):
+        """Test: un valor leído antes de una invalidación no se guarda"""
+        cache = LRUCache(max_entries=10, max_bytes=100, ttl=60)
+        generation = cache.generation
+        cache.clear()
+
+        assert cache.put("a", "viejo", 5, generation) is False
+        assert cache.put("a", "nuevo", 5, cache.generation) is True
+        assert cache.stats()["invalidations"] == 1
+
+    def test_reemplazo_actualiza_bytes(self):
+        cache = LRUCache(max_entries=10, max_bytes=100, ttl=60)
+        cache.put("a", 1, 30)
+        cache.put("a", 2, 10)
+        assert cache.stats()["bytes"] == 10
+        cache.discard("a")
+        assert cache.stats()["bytes"] == 0
@@ -1,47 +1,12 @@
+import json
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session
 
-from app.main import app
-from app.database import Base, get_db
-from app.models import BebidaDB
+from app import metrics
+from app.cache import MenuCache, menu_cache, parse_accept_encoding
+from app.events import change_bus
+from app.models import BebidaCreate, BebidaDB, BebidaRepository
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def override_get_db():
-    """Override de la dependencia de base de datos para tests"""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-
-
-@pytest.fixture(autouse=True)
-def setup_database():
-    """Configura la base de datos para cada test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture
-def client():
-    """Cliente de prueba"""
-    return TestClient(app)
 
 class TestMenu:
     """Tests para el menú de bebidas"""
@@ -105,6 +70,19 @@ class TestMenu:
         response = client.get("/menu/NoExiste")
         assert response.status_code == 404
     
+    def test_crear_bebida_un_solo_viaje(self, client, monkeypatch):
+        """Test: crear una bebida es un único INSERT en bebidas, sin releerla tras el commit"""
+        sentencias = []
+        monkeypatch.setattr(metrics, "query_observers", [lambda stmt, _: sentencias.append(stmt)])
+
+        response = client.post("/menu", json={"name": "Chai", "size": "small", "price": 2.80})
+
+        assert response.status_code == 201
+        assert response.json()["name"] == "Chai"
+        assert sum(s.startswith("INSERT INTO bebidas ") for s in sentencias) == 1
+        # La respuesta sale del RETURNING: no hay un SELECT que recargue la fila
+        assert not any("FROM bebidas " in s for s in sentencias)
+
     def test_no_duplicar_bebidas(self, client):
         """Test: no permitir bebidas duplicadas"""
         bebida = {
@@ -114,4 +92,628 @@ class TestMenu:
         }
         client.post("/menu", json=bebida)
         response = client.post("/menu", json=bebida)
-        assert response.status_code == 400
\ No newline at end of file
+        assert response.status_code == 400
+
+
+class TestMenuCache:
+    """Tests para la caché del menú"""
+
+    def test_segunda_consulta_usa_cache(self, client):
+        """Test: la segunda consulta del menú es un acierto de caché"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.50})
+        antes = client.get("/metrics/cache").json()
+
+        primera = client.get("/menu")
+        segunda = client.get("/menu")
+
+        despues = client.get("/metrics/cache").json()
+        assert primera.json() == segunda.json()
+        assert despues["misses"] == antes["misses"] + 1
+        assert despues["hits"] == antes["hits"] + 1
+
+    def test_crear_bebida_invalida_cache(self, client):
+        """Test: crear una bebida invalida el menú en caché"""
+        assert client.get("/menu").json() == []
+        version = client.get("/metrics/cache").json()["version"]
+
+        client.post("/menu", json={"name": "Mocha", "size": "large", "price": 4.75})
+
+        assert client.get("/metrics/cache").json()["version"] == version + 1
+        assert [b["name"] for b in client.get("/menu").json()] == ["Mocha"]
+
+    def test_eliminar_bebida_invalida_cache(self, client):
+        """Test: eliminar una bebida invalida el menú en caché"""
+        creada = client.post(
+            "/menu", json={"name": "Americano", "size": "medium", "price": 2.50}
+        ).json()
+        assert len(client.get("/menu").json()) == 1
+
+        response = client.delete(f"/menu/{creada['id']}")
+
+        assert response.status_code == 204
+        assert client.get("/menu").json() == []
+
+    def test_seed_invalida_cache(self, client):
+        """Test: inicializar el menú invalida la caché"""
+        assert client.get("/menu").json() == []
+        client.post("/menu/seed")
+        assert len(client.get("/menu").json()) == 10
+
+
+class TestLookup:
+    """Tests para la búsqueda de bebidas por lote"""
+
+    def test_lookup_encuentra_y_reporta_faltantes(self, client):
+        """Test: el lote devuelve coincidencias y faltantes explícitos"""
+        client.post("/menu/seed")
+
+        response = client.post("/menu/lookup", json={"items": [
+            {"name": "latte", "size": "large"},
+            {"name": "Mocha", "size": "small"},
+            {"name": "Espresso", "size": "SMALL"},
+        ]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [(b["name"], b["size"]) for b in data["found"]] == [
+            ("Latte", "large"), ("Espresso", "small")
+        ]
+        assert data["missing"] == [{"name": "Mocha", "size": "small"}]
+
+    def test_lookup_vacio_rechazado(self, client):
+        """Test: rechazar un lote sin items"""
+        response = client.post("/menu/lookup", json={"items": []})
+        assert response.status_code == 422
+
+
+class TestMenuPaginacion:
+    """Tests para la paginación por keyset y el streaming NDJSON"""
+
+    def test_paginacion_keyset(self, client):
+        """Test: recorrer el menú por páginas con after_id"""
+        client.post("/menu/seed")
+
+        primera = client.get("/menu", params={"limit": 4})
+        assert len(primera.json()) == 4
+        cursor = primera.headers["X-Next-After-Id"]
+        assert cursor == str(primera.json()[-1]["id"])
+
+        resto = client.get("/menu", params={"after_id": cursor, "limit": 10})
+        assert len(resto.json()) == 6
+        assert "X-Next-After-Id" not in resto.headers
+        assert all(b["id"] > int(cursor) for b in resto.json())
+
+    def test_limite_invalido(self, client):
+        """Test: rechazar un tamaño de página fuera de rango"""
+        assert client.get("/menu", params={"limit": 0}).status_code == 422
+
+    def test_streaming_ndjson(self, client):
+        """Test: el menú se emite como NDJSON cuando se pide"""
+        client.post("/menu/seed")
+
+        response = client.get("/menu", headers={"Accept": "application/x-ndjson"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lineas = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lineas) == 10
+        assert [b["id"] for b in lineas] == sorted(b["id"] for b in lineas)
+
+    def test_streaming_ndjson_respeta_limit(self, client):
+        """Test: limit y after_id también acotan el stream NDJSON"""
+        client.post("/menu/seed")
+        ids = [b["id"] for b in client.get("/menu").json()]
+
+        response = client.get(
+            "/menu", params={"after_id": ids[2], "limit": 2},
+            headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == ids[3:5]
+
+    def test_cors_expone_cabeceras(self, client):
+        """Test: el navegador puede leer las cabeceras de paginación y validación"""
+        response = client.get(
+            "/menu", params={"limit": 1}, headers={"Origin": "http://localhost:4200"}
+        )
+        expuestas = response.headers["access-control-expose-headers"]
+        for cabecera in ("X-Next-After-Id", "ETag", "Last-Modified"):
+            assert cabecera in expuestas
+
+
+class TestBusqueda:
+    """Tests para la búsqueda de bebidas por nombre"""
+
+    def test_ranking_exacto_prefijo_subcadena(self, client):
+        """Test: los resultados se ordenan exacto > prefijo > subcadena"""
+        for nombre in ["Iced Latte", "Latte Macchiato", "Latte"]:
+            client.post("/menu", json={"name": nombre, "size": "medium", "price": 3.0})
+
+        response = client.get("/menu/search", params={"q": "latte"})
+
+        assert response.status_code == 200
+        assert [b["name"] for b in response.json()] == ["Latte", "Latte Macchiato", "Iced Latte"]
+
+    def test_busqueda_respeta_limite(self, client):
+        """Test: la búsqueda devuelve como máximo limit resultados"""
+        client.post("/menu/seed")
+        response = client.get("/menu/search", params={"q": "a", "limit": 2})
+        assert len(response.json()) == 2
+
+    def test_busqueda_sin_resultados(self, client):
+        """Test: una búsqueda sin coincidencias devuelve lista vacía"""
+        client.post("/menu/seed")
+        assert client.get("/menu/search", params={"q": "chai"}).json() == []
+
+    def test_get_by_name_devuelve_mas_relevante(self, client):
+        """Test: GET /menu/{name} prefiere la coincidencia exacta"""
+        client.post("/menu", json={"name": "Mocha Blanco", "size": "large", "price": 5.0})
+        client.post("/menu", json={"name": "Mocha", "size": "small", "price": 4.0})
+
+        assert client.get("/menu/mocha").json()["name"] == "Mocha"
+
+    def test_indice_se_actualiza_con_escrituras(self, client):
+        """Test: el índice en memoria ve las bebidas nuevas"""
+        assert client.get("/menu/search", params={"q": "brew"}).json() == []
+        client.post("/menu", json={"name": "Cold Brew", "size": "medium", "price": 3.75})
+        assert [b["name"] for b in client.get("/menu/search", params={"q": "brew"}).json()] == [
+            "Cold Brew"
+        ]
+
+
+class TestBulk:
+    """Tests para la inserción por lote"""
+
+    def test_bulk_reporta_insertadas_y_omitidas(self, client):
+        """Test: el lote inserta las nuevas y omite duplicadas"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.50})
+
+        response = client.post("/menu/bulk", json={"items": [
+            {"name": "latte", "size": "small", "price": 2.50},
+            {"name": "Chai", "size": "medium", "price": 3.10},
+            {"name": "chai", "size": "medium", "price": 3.20},
+            {"name": "Chai", "size": "large", "price": 3.90},
+        ]})
+
+        assert response.status_code == 201
+        data = response.json()
+        assert (data["inserted"], data["skipped"]) == (2, 2)
+        assert [r["status"] for r in data["results"]] == [
+            "skipped", "inserted", "skipped", "inserted"
+        ]
+        assert data["results"][0]["reason"] == "Ya existe en el menú"
+        assert data["results"][2]["reason"] == "Duplicada en el lote"
+        assert all(r["id"] for r in data["results"] if r["status"] == "inserted")
+        assert len(client.get("/menu").json()) == 3
+
+    def test_bulk_valida_items(self, client):
+        """Test: un item inválido rechaza el lote completo"""
+        response = client.post("/menu/bulk", json={"items": [
+            {"name": "Chai", "size": "tall", "price": 3.10},
+        ]})
+        assert response.status_code == 422
+
+    def test_seed_es_idempotente(self, client):
+        """Test: el seed no duplica bebidas al repetirse"""
+        primera = client.post("/menu/seed").json()
+        segunda = client.post("/menu/seed").json()
+        assert primera["total_bebidas"] == 10
+        assert segunda == {"message": "Menú inicializado con 0 bebidas", "total_bebidas": 10}
+
+    def test_seed_error_devuelve_500(self, client, monkeypatch):
+        """Test: un fallo del seed deshace la transacción igual que /menu/bulk"""
+        def falla(db, bebidas):
+            raise RuntimeError("sin conexión")
+
+        monkeypatch.setattr(BebidaRepository, "bulk_create", staticmethod(falla))
+        response = client.post("/menu/seed")
+
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Error al inicializar el menú: sin conexión"
+
+
+@pytest.mark.postgres
+class TestBulkPostgres:
+    """Inserción por lote con COPY contra un PostgreSQL real (TEST_POSTGRES_URL)"""
+
+    def test_copy_omite_existentes_y_pasa_por_eventos(self, postgres_engine, monkeypatch):
+        sentencias = []
+        monkeypatch.setattr(metrics, "query_observers", [lambda stmt, _: sentencias.append(stmt)])
+        with Session(postgres_engine) as db:
+            BebidaRepository.bulk_create(db, [BebidaCreate(name="Latte", size="small", price=2.5)])
+            resultados = BebidaRepository.bulk_create(db, [
+                BebidaCreate(name="latte", size="small", price=2.5),
+                BebidaCreate(name="Chai, con leche", size="medium", price=3.1),
+            ])
+
+            assert [r.status for r in resultados] == ["skipped", "inserted"]
+            assert BebidaRepository.count(db) == 2
+        assert any(s.startswith("INSERT INTO bebidas") for s in sentencias)
+
+
+class TestUpsert:
+    """Tests para el nombre normalizado y el upsert"""
+
+    def test_duplicado_con_otro_formato(self, client):
+        """Test: mayúsculas y espacios extra no evitan detectar duplicados"""
+        client.post("/menu", json={"name": "Cold Brew", "size": "medium", "price": 3.75})
+        response = client.post("/menu", json={"name": "  cold   BREW ", "size": "medium", "price": 3.75})
+        assert response.status_code == 400
+
+    def test_upsert_crea_y_actualiza(self, client):
+        """Test: PUT crea la bebida y luego actualiza su precio"""
+        creada = client.put("/menu/Flat White/medium", json={"price": 3.40})
+        assert creada.status_code == 200
+
+        actualizada = client.put("/menu/flat white/medium", json={"price": 3.60})
+        assert actualizada.status_code == 200
+        assert actualizada.json()["id"] == creada.json()["id"]
+        assert actualizada.json()["price"] == 3.60
+
+        menu = client.get("/menu").json()
+        assert [(b["name"], b["price"]) for b in menu] == [("Flat White", 3.60)]
+
+    def test_upsert_valida_tamano(self, client):
+        """Test: PUT rechaza tamaños inválidos"""
+        response = client.put("/menu/Latte/tall", json={"price": 3.00})
+        assert response.status_code == 422
+
+
+class TestNombreYTamano:
+    """Tests para la búsqueda exacta por nombre y tamaño"""
+
+    def test_encuentra_tamano_pedido(self, client):
+        """Test: devuelve el tamaño pedido aunque existan otros"""
+        client.post("/menu/seed")
+
+        response = client.get("/menu/latte/large")
+
+        assert response.status_code == 200
+        assert (response.json()["name"], response.json()["size"]) == ("Latte", "large")
+
+    def test_tamano_inexistente(self, client):
+        """Test: 404 cuando la bebida no existe en ese tamaño"""
+        client.post("/menu/seed")
+        assert client.get("/menu/Mocha/small").status_code == 404
+
+    def test_no_hace_coincidencia_parcial(self, client):
+        """Test: el nombre debe coincidir completo"""
+        client.post("/menu/seed")
+        assert client.get("/menu/Lat/small").status_code == 404
+
+
+class TestMenuSnapshot:
+    """Tests para el menú pre-serializado y comprimido"""
+
+    def test_snapshot_se_reutiliza(self, client):
+        """Test: los aciertos devuelven los mismos bytes sin re-serializar"""
+        client.post("/menu/seed")
+        client.get("/menu")
+
+        primero = menu_cache.get(lambda: pytest.fail("no debe consultar la base"))
+        segundo = menu_cache.get(lambda: pytest.fail("no debe consultar la base"))
+
+        assert primero is segundo
+        assert json.loads(primero.body) == client.get("/menu").json()
+
+    def test_menu_comprimido_con_gzip(self, client):
+        """Test: se sirve la variante gzip cuando el cliente la acepta"""
+        client.post("/menu/seed")
+
+        response = client.get("/menu", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert len(response.json()) == 10
+
+    def test_menu_sin_compresion(self, client):
+        """Test: sin Accept-Encoding se envía el JSON plano"""
+        client.post("/menu/seed")
+
+        response = client.get("/menu", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert len(response.json()) == 10
+
+    def test_parse_accept_encoding(self):
+        """Test: se respetan los pesos q del encabezado"""
+        assert parse_accept_encoding("gzip;q=0, br, *;q=0.5") == {"gzip": 0.0, "br": 1.0, "*": 0.5}
+
+
+class TestCondicionales:
+    """Tests para ETag, Last-Modified y respuestas 304"""
+
+    def test_menu_304_con_if_none_match(self, client):
+        """Test: el mismo ETag devuelve 304 sin cuerpo"""
+        client.post("/menu/seed")
+        primera = client.get("/menu")
+        etag = primera.headers["etag"]
+        assert "last-modified" in primera.headers
+
+        response = client.get("/menu", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_menu_cambia_etag_tras_escritura(self, client):
+        """Test: una escritura invalida el ETag anterior"""
+        client.post("/menu/seed")
+        etag = client.get("/menu").headers["etag"]
+
+        client.post("/menu", json={"name": "Chai", "size": "small", "price": 2.80})
+        response = client.get("/menu", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_menu_304_con_if_modified_since(self, client):
+        """Test: If-Modified-Since con la fecha servida devuelve 304"""
+        client.post("/menu/seed")
+        last_modified = client.get("/menu").headers["last-modified"]
+
+        response = client.get("/menu", headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+
+    def test_last_modified_igual_en_todos_los_workers(self, client, monkeypatch):
+        """Test: tras un borrado, otro worker sirve el mismo Last-Modified"""
+        client.post("/menu/seed")
+        latte = client.get("/menu/Latte").json()
+        client.delete(f"/menu/{latte['id']}")
+        last_modified = client.get("/menu").headers["last-modified"]
+
+        # Un worker recién iniciado no vio el borrado: lo toma del registro de cambios
+        monkeypatch.setattr("app.cache.menu_cache", MenuCache())
+        response = client.get("/menu")
+
+        assert response.headers["last-modified"] == last_modified
+
+    def test_bebida_por_nombre_304(self, client):
+        """Test: GET /menu/{name} responde 304 con su ETag"""
+        client.post("/menu/seed")
+        etag = client.get("/menu/latte").headers["etag"]
+
+        assert client.get("/menu/latte", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/menu/mocha", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_nombre_y_tamano_usa_updated_at(self, client):
+        """Test: la bebida exacta expone su propio ETag y Last-Modified"""
+        client.put("/menu/Latte/small", json={"price": 2.50})
+        primera = client.get("/menu/Latte/small")
+        assert "last-modified" in primera.headers
+
+        repetida = client.get("/menu/Latte/small", headers={"If-None-Match": primera.headers["etag"]})
+        assert repetida.status_code == 304
+
+        client.put("/menu/Latte/small", json={"price": 2.75})
+        cambiada = client.get("/menu/Latte/small", headers={"If-None-Match": primera.headers["etag"]})
+        assert cambiada.status_code == 200
+        assert cambiada.json()["price"] == 2.75
+
+    def test_lookup_304(self, client):
+        """Test: el mismo lote con su ETag devuelve 304"""
+        client.post("/menu/seed")
+        lote = {"items": [{"name": "Latte", "size": "small"}]}
+        etag = client.post("/menu/lookup", json=lote).headers["etag"]
+
+        response = client.post("/menu/lookup", json=lote, headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def test_if_none_match_asterisco_no_oculta_404(self, client):
+        """Test: If-None-Match: * sobre una bebida inexistente sigue siendo 404"""
+        client.post("/menu/seed")
+        assert client.get("/menu/nada", headers={"If-None-Match": "*"}).status_code == 404
+        assert client.get("/menu/latte", headers={"If-None-Match": "*"}).status_code == 304
+
+    def test_validadores_sin_serializar_el_menu(self, client, monkeypatch):
+        """Test: lookup y búsqueda validan contra el registro de cambios, no contra el menú"""
+        client.post("/menu/seed")
+
+        def sin_menu(db):
+            raise AssertionError("no debía serializar el menú")
+
+        monkeypatch.setattr("app.main.load_menu", sin_menu)
+        lote = {"items": [{"name": "Latte", "size": "small"}]}
+        primera = client.post("/menu/lookup", json=lote)
+        assert primera.status_code == 200
+
+        client.post("/menu", json={"name": "Chai", "size": "small", "price": 2.80})
+        segunda = client.post(
+            "/menu/lookup", json=lote, headers={"If-None-Match": primera.headers["etag"]}
+        )
+        assert segunda.status_code == 200
+        assert segunda.headers["etag"] != primera.headers["etag"]
+
+
+class TestCambios:
+    """Tests para la sincronización incremental del menú"""
+
+    def test_since_cero_envia_menu_completo(self, client):
+        """Test: una réplica nueva recibe todo el menú"""
+        client.post("/menu/seed")
+
+        data = client.get("/menu/changes", params={"since": 0}).json()
+
+        assert data["full_resync"] is True
+        assert len(data["upserts"]) == 10
+        assert data["version"] >= 1
+
+    def test_solo_cambios_desde_version(self, client):
+        """Test: se devuelven solo las filas cambiadas y los borrados"""
+        client.post("/menu/seed")
+        version = client.get("/menu/changes").json()["version"]
+        latte = client.get("/menu/Latte/small").json()
+
+        client.post("/menu", json={"name": "Chai", "size": "small", "price": 2.80})
+        client.put("/menu/Mocha/large", json={"price": 5.00})
+        client.delete(f"/menu/{latte['id']}")
+
+        data = client.get("/menu/changes", params={"since": version}).json()
+
+        assert data["full_resync"] is False
+        assert data["version"] == version + 3
+        assert sorted((b["name"], b["price"]) for b in data["upserts"]) == [
+            ("Chai", 2.80), ("Mocha", 5.00)
+        ]
+        assert data["deleted"] == [latte["id"]]
+
+    def test_sin_cambios(self, client):
+        """Test: la versión actual no devuelve cambios"""
+        client.post("/menu/seed")
+        version = client.get("/menu/changes").json()["version"]
+
+        data = client.get("/menu/changes", params={"since": version}).json()
+
+        assert (data["upserts"], data["deleted"], data["full_resync"]) == ([], [], False)
+
+    def test_version_futura_pide_resync(self, client):
+        """Test: una versión desconocida fuerza la resincronización completa"""
+        client.post("/menu/seed")
+        assert client.get("/menu/changes", params={"since": 999}).json()["full_resync"] is True
+
+
+class TestStreamCambios:
+    """Tests para la publicación de cambios al stream SSE"""
+
+    def test_escrituras_publican_eventos(self, client):
+        """Test: crear, actualizar y eliminar publican un evento cada uno con su versión"""
+        creada = client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5}).json()
+        client.put("/menu/Latte/small", json={"price": 3.0})
+        client.delete(f"/menu/{creada['id']}")
+
+        eventos = change_bus.events_after(0)
+        assert [e.id for e in eventos] == [1, 2, 3]
+        assert [e.type for e in eventos] == ["upserted", "upserted", "deleted"]
+        assert eventos[1].data["price"] == 3.0
+        assert eventos[2].data == {"id": creada["id"]}
+
+    def test_seed_publica_un_evento_por_bebida(self, client):
+        """Test: el seed publica cada bebida insertada y un segundo seed no publica nada"""
+        client.post("/menu/seed")
+        client.post("/menu/seed")
+
+        eventos = change_bus.events_after(0)
+        assert [e.id for e in eventos] == list(range(1, 11))
+        assert {e.type for e in eventos} == {"upserted"}
+
+    def test_stream_rechaza_last_event_id_invalido(self, client):
+        """Test: el parámetro last_event_id debe ser un entero no negativo"""
+        response = client.get("/menu/stream?last_event_id=-1")
+        assert response.status_code == 422
+
+
+class TestNombresDesconocidos:
+    """Tests para las búsquedas de bebidas que no existen"""
+
+    def test_nombre_desconocido_no_consulta_la_busqueda(self, client):
+        """Test: un nombre fuera del menú devuelve 404 desde el filtro de Bloom"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        antes = client.get("/metrics/cache").json()["unknown_names"]["bloom_rejections"]
+
+        response = client.get("/menu/Frappuccino")
+
+        assert response.status_code == 404
+        metricas = client.get("/metrics/cache").json()["unknown_names"]
+        assert metricas["bloom_rejections"] == antes + 1
+
+    def test_crear_bebida_reconstruye_el_filtro(self, client):
+        """Test: tras crear la bebida, el nombre antes desconocido se encuentra"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        assert client.get("/menu/Mocha").status_code == 404
+
+        client.post("/menu", json={"name": "Mocha", "size": "large", "price": 4.75})
+
+        assert client.get("/menu/Mocha").json()["name"] == "Mocha"
+
+    def test_filtro_no_serializa_el_menu(self, client, monkeypatch):
+        """Test: tras una escritura, el filtro se arma solo con los nombres"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+
+        def sin_menu(db):
+            raise AssertionError("no debía serializar el menú")
+
+        monkeypatch.setattr("app.search.load_menu", sin_menu)
+        assert client.get("/menu/Frappuccino").status_code == 404
+
+
+class TestCacheBusquedas:
+    """Tests para la caché LRU de búsquedas por nombre y tamaño"""
+
+    def test_segunda_busqueda_sale_de_cache(self, client):
+        """Test: la misma bebida se sirve de la caché sin cambiar la respuesta"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        antes = client.get("/metrics/lookup-cache").json()
+
+        primera = client.get("/menu/Latte/small")
+        segunda = client.get("/menu/latte/SMALL")
+
+        despues = client.get("/metrics/lookup-cache").json()
+        assert primera.content == segunda.content
+        assert primera.headers["etag"] == segunda.headers["etag"]
+        assert despues["misses"] == antes["misses"] + 1
+        assert despues["hits"] == antes["hits"] + 1
+
+    def test_escritura_invalida(self, client):
+        """Test: actualizar el precio descarta la respuesta en caché"""
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        assert client.get("/menu/Latte").json()["price"] == 2.5
+        assert client.get("/menu/Latte/small").json()["price"] == 2.5
+
+        client.put("/menu/Latte/small", json={"price": 3.0})
+
+        assert client.get("/menu/Latte").json()["price"] == 3.0
+        assert client.get("/menu/Latte/small").json()["price"] == 3.0
+
+    def test_304_desde_cache(self, client):
+        """Test: el ETag guardado responde If-None-Match sin consultar la base"""
+        client.post("/menu", json={"name": "Mocha", "size": "large", "price": 4.75})
+        etag = client.get("/menu/Mocha/large").headers["etag"]
+
+        response = client.get("/menu/Mocha/large", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
+class TestCotizacion:
+    """Tests para la cotización de pedidos completos"""
+
+    def test_cotiza_lineas_y_total(self, client):
+        """Test: cada línea lleva su precio y el total suma las cantidades"""
+        client.post("/menu/seed")
+
+        response = client.post("/menu/quote", json={"items": [
+            {"name": "Latte", "size": "small", "quantity": 2},
+            {"name": " mocha ", "size": "LARGE", "quantity": 1},
+        ]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["available"] is True
+        assert [(l["name"], l["unit_price"], l["line_total"]) for l in data["lines"]] == [
+            ("Latte", 2.5, 5.0), ("Mocha", 4.75, 4.75)
+        ]
+        assert data["total"] == 9.75
+
+    def test_lineas_no_disponibles(self, client):
+        """Test: las líneas faltantes llevan su error y no suman al total"""
+        client.post("/menu/seed")
+
+        data = client.post("/menu/quote", json={"items": [
+            {"name": "Espresso", "size": "small", "quantity": 3},
+            {"name": "Mocha", "size": "small", "quantity": 1},
+            {"name": "Frappé", "size": "medium", "quantity": 1},
+        ]}).json()
+
+        assert data["available"] is False
+        assert data["total"] == 6.0
+        assert [l["available"] for l in data["lines"]] == [True, False, False]
+        assert data["lines"][1]["error"] == "Bebida 'Mocha' no disponible en tamaño 'small'"
+        assert data["lines"][2]["index"] == 2
+
+    def test_cantidad_invalida(self, client):
+        """Test: la cantidad debe ser positiva"""
+        response = client.post("/menu/quote", json={"items": [
+            {"name": "Latte", "size": "small", "quantity": 0}
+        ]})
+        assert response.status_code == 422
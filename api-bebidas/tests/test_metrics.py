@@ -0,0 +1,59 @@
+from app.metrics import Counter, Histogram, REQUESTS_TOTAL, REQUEST_QUERIES
+
+
+class TestFormatoPrometheus:
+    """Tests para la exposición de métricas en texto"""
+
+    def test_histograma_acumulado(self):
+        """Test: los buckets son acumulados y terminan en +Inf"""
+        histogram = Histogram("latencia", "Latencia", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, ("/menu",))
+
+        lines = histogram.render()
+        assert 'latencia_bucket{route="/menu",le="0.1"} 2' in lines
+        assert 'latencia_bucket{route="/menu",le="1.0"} 3' in lines
+        assert 'latencia_bucket{route="/menu",le="+Inf"} 4' in lines
+        assert 'latencia_count{route="/menu"} 4' in lines
+        assert "# TYPE latencia histogram" in lines
+
+    def test_escapa_etiquetas(self):
+        counter = Counter("total", "Total", ("path",))
+        counter.inc(('a"b',))
+        assert 'total{path="a\\"b"} 1' in counter.render()
+
+
+class TestMetricsEndpoint:
+    """Tests para el middleware y el endpoint /metrics"""
+
+    def test_registra_ruta_por_plantilla(self, client):
+        """Test: las series usan la plantilla de la ruta y el código de estado"""
+        labels = ("GET", "/menu/{name}/{size}", "404")
+        antes = REQUESTS_TOTAL.value(labels)
+
+        client.get("/menu/Latte/small")
+        client.get("/menu/Mocha/large")
+
+        assert REQUESTS_TOTAL.value(labels) == antes + 2
+
+    def test_cuenta_consultas_por_peticion(self, client):
+        """Test: las consultas SQL de la petición quedan asociadas a su ruta"""
+        labels = ("POST", "/menu")
+        antes = REQUEST_QUERIES.count(labels)
+        sin_consultas = REQUEST_QUERIES._series.get(labels, ([0],))[0][0]
+
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+
+        assert REQUEST_QUERIES.count(labels) == antes + 1
+        # La observación no cayó en el bucket de cero consultas
+        assert REQUEST_QUERIES._series[labels][0][0] == sin_consultas
+
+    def test_expone_texto_prometheus(self, client):
+        client.get("/")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+        assert "db_query_duration_seconds_bucket" in response.text
+        assert 'http_requests_in_flight{method="GET"} 1' in response.text
@@ -0,0 +1,244 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.cache import menu_cache
+from app.database import Base
+from app.events import ChangeBus, change_bus, publish_changes, remote_menu_changed
+from app.models import (
+    CHANGE_CHANNEL, CHANGE_NOTIFY, BebidaCreate, BebidaRepository, change_notification,
+)
+from app.notify import ChangeListener
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """Motor SQLite en archivo, compartible entre hilos como entre workers"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'notify.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def crear(engine, name):
+    with Session(engine) as db:
+        BebidaRepository.create(db, BebidaCreate(name=name, size="small", price=2.0))
+
+
+def esperar(condicion, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condicion()
+
+
+def otro_worker(operation, ids):
+    return json.dumps({"pid": os.getpid() + 1, "operation": operation, "ids": ids})
+
+
+class Recorder:
+    """Handler que anota cada aviso y publica el registro en un bus propio"""
+
+    def __init__(self):
+        self.cambios = []
+        self.bus = ChangeBus()
+
+    def __call__(self, db, change):
+        self.cambios.append(change)
+        publish_changes(db, self.bus)
+
+
+class FakeNotify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        self.connection.executed.append(statement)
+
+
+class FakePgConnection:
+    """Conexión con la interfaz de psycopg2 que usa _listen, sobre un pipe"""
+
+    def __init__(self):
+        self._read, self._write = os.pipe()
+        self._pending = []
+        self.autocommit = False
+        self.notifies = []
+        self.executed = []
+
+    def fileno(self):
+        return self._read
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def notify(self, payload):
+        self._pending.append(FakeNotify(payload))
+        os.write(self._write, b"n")
+
+    def poll(self):
+        os.read(self._read, 1024)
+        while self._pending:
+            self.notifies.append(self._pending.pop(0))
+
+    def close(self):
+        os.close(self._read)
+        os.close(self._write)
+
+
+class FakeNotifyListener(ChangeListener):
+    """Listener en modo notify cuya conexión LISTEN es un FakePgConnection"""
+
+    def __init__(self, *args, fail_first=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mode = "notify"
+        self.fail_first = fail_first
+        self.connections = []
+
+    @contextmanager
+    def _connect(self):
+        if self.fail_first:
+            self.fail_first = False
+            raise OSError("conexión rechazada")
+        connection = FakePgConnection()
+        self.connections.append(connection)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+
+class TestChangeListener:
+    """Tests para la invalidación de cachés entre workers"""
+
+    def test_polling_detecta_escrituras(self, file_engine):
+        """Test: sin LISTEN/NOTIFY, un cambio de versión dispara el aviso"""
+        handler = Recorder()
+        listener = ChangeListener(file_engine, handler)
+        assert listener.mode == "poll"
+
+        assert listener.poll_once() is False
+        crear(file_engine, "Latte")
+        assert listener.poll_once() is True
+        assert listener.poll_once() is False
+        assert handler.cambios == [{"version": 1}]
+        # También en modo polling el cambio llega al stream con su versión
+        assert [(e.id, e.type) for e in handler.bus.events_after(0)] == [(1, "upserted")]
+
+    def test_hilo_de_fondo(self, file_engine):
+        """Test: el hilo de polling avisa sin intervención del request"""
+        handler = Recorder()
+        listener = ChangeListener(file_engine, handler, interval=0.01)
+        listener.start()
+        try:
+            esperar(lambda: listener._last_version is not None)
+            crear(file_engine, "Mocha")
+            esperar(lambda: handler.cambios)
+        finally:
+            listener.stop()
+        assert handler.cambios == [{"version": 1}]
+        assert listener.stats()["running"] is False
+
+    def test_ignora_notify_propio(self, file_engine):
+        """Test: el worker que hizo la escritura no se invalida dos veces"""
+        handler = Recorder()
+        listener = ChangeListener(file_engine, handler)
+
+        listener.handle_payload(change_notification([1], "upsert"))
+        listener.handle_payload(otro_worker("delete", [2]))
+
+        assert handler.cambios == [{"operation": "delete", "ids": [2]}]
+
+    def test_payload_grande_omite_ids(self):
+        """Test: los lotes grandes no superan el límite de NOTIFY"""
+        payload = json.loads(change_notification(list(range(5000)), "upsert"))
+        assert "ids" not in payload
+        assert payload["count"] == 5000
+
+    def test_cambio_remoto_invalida_y_publica(self, file_engine):
+        """Test: un aviso de otro worker invalida la caché y publica desde el registro"""
+        crear(file_engine, "Latte")
+        version = menu_cache.version
+
+        with Session(file_engine) as db:
+            remote_menu_changed(db, {"operation": "upsert", "ids": [1]})
+            remote_menu_changed(db, {"version": 1})
+
+        assert menu_cache.version == version + 2
+        eventos = change_bus.events_after(0)
+        assert [(e.id, e.type, e.data["name"]) for e in eventos] == [(1, "upserted", "Latte")]
+
+    def test_listen_entrega_notify(self, file_engine):
+        """Test: el bucle LISTEN procesa los NOTIFY de otros workers e ignora los propios"""
+        handler = Recorder()
+        listener = FakeNotifyListener(file_engine, handler, interval=0.01)
+        listener.start()
+        try:
+            assert esperar(lambda: listener.connections and listener.connections[0].executed)
+            connection = listener.connections[0]
+            crear(file_engine, "Latte")
+            connection.notify(change_notification([1], "upsert"))
+            connection.notify(otro_worker("upsert", [1]))
+            assert esperar(lambda: handler.bus.last_id == 1)
+        finally:
+            listener.stop()
+
+        assert connection.executed == [f"LISTEN {CHANGE_CHANNEL}"]
+        assert connection.autocommit is True
+        assert handler.cambios == [{"operation": "upsert", "ids": [1]}]
+
+    def test_listen_relee_el_registro_tras_reconectar(self, file_engine):
+        """Test: lo escrito mientras no había LISTEN se publica al reconectar"""
+        crear(file_engine, "Latte")
+        handler = Recorder()
+        listener = FakeNotifyListener(file_engine, handler, interval=0.01, fail_first=True)
+        listener.start()
+        try:
+            assert esperar(lambda: handler.bus.last_id == 1)
+        finally:
+            listener.stop()
+
+        assert listener.stats()["reconnects"] == 1
+        assert handler.cambios == [{}]
+
+
+@pytest.mark.postgres
+class TestListenPostgres:
+    """LISTEN/NOTIFY contra un PostgreSQL real (TEST_POSTGRES_URL)"""
+
+    def test_notify_de_otro_worker(self, postgres_engine):
+        handler = Recorder()
+        listener = ChangeListener(postgres_engine, handler, interval=0.05)
+        assert listener.mode == "notify"
+        crear(postgres_engine, "Latte")
+        listener.start()
+        try:
+            # Se repite hasta que el LISTEN del hilo esté activo
+            def enviar():
+                with Session(postgres_engine) as db:
+                    db.execute(CHANGE_NOTIFY, {
+                        "channel": CHANGE_CHANNEL, "payload": otro_worker("upsert", [1])
+                    })
+                    db.commit()
+                return esperar(lambda: handler.bus.last_id == 1, timeout=0.2)
+
+            assert any(enviar() for _ in range(25))
+        finally:
+            listener.stop()
+        assert handler.bus.events_after(0)[0].data["name"] == "Latte"
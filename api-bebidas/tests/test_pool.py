@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.main import app
+from app.pool import InstrumentedQueuePool, pool_status
+
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    """Motor con un pool de una sola conexión y sin overflow"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+class TestPool:
+    """Tests para el pool de conexiones instrumentado"""
+
+    def test_registra_checkouts(self, pooled_engine):
+        """Test: cada checkout queda contado en las estadísticas"""
+        for _ in range(3):
+            with pooled_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        status = pool_status(pooled_engine.pool)
+        assert status["checkouts"] == 3
+        assert status["checked_out"] == 0
+        assert status["timeouts"] == 0
+
+    def test_registra_timeouts(self, pooled_engine):
+        """Test: un pool agotado reporta la espera y el timeout"""
+        with pooled_engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                pooled_engine.connect()
+            status = pool_status(pooled_engine.pool)
+
+        assert status["checked_out"] == 1
+        assert status["waits"] == 1
+        assert status["timeouts"] == 1
+        assert status["max_wait_ms"] >= 50
+
+    def test_endpoint_metrics_pool(self):
+        """Test: el endpoint expone el estado del pool de la aplicación"""
+        response = TestClient(app).get("/metrics/pool")
+        assert response.status_code == 200
+        assert response.json()["pool"] == "InstrumentedQueuePool"
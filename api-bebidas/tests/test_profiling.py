@@ -0,0 +1,114 @@
+import asyncio
+import os
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.debug_routes import router as debug_router
+from app.main import app
+from app.profiling import ProfileStore, ProfilingMiddleware, RequestProfile, active_profile, profiled
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles"))
+
+
+class TestProfiling:
+    """Tests para el perfilado por petición"""
+
+    def test_perfila_con_header_de_confianza(self, store):
+        """Test: con el token correcto se guardan el .prof y el resumen"""
+        client = TestClient(ProfilingMiddleware(app, store=store, token="secreto"))
+
+        response = client.get("/menu/Latte/small", headers={"X-Profile-Token": "secreto"})
+
+        assert response.status_code == 404
+        perfiles = store.index()
+        assert len(perfiles) == 1
+        assert perfiles[0]["method"] == "GET"
+        assert perfiles[0]["route"] == "menu_name_size"
+        resumen = store.summary(perfiles[0]["id"])
+        assert "get_by_name_and_size" in resumen
+
+    def test_perfila_validacion_y_serializacion(self, store):
+        """Test: el perfil cubre el handler completo, no solo el endpoint"""
+        client = TestClient(ProfilingMiddleware(app, store=store, token="secreto"))
+
+        client.post(
+            "/menu",
+            json={"name": "Latte", "size": "small", "price": 2.5},
+            headers={"X-Profile-Token": "secreto"},
+        )
+
+        perfil = os.path.join(store.directory, f"{store.index()[0]['id']}.prof")
+        funciones = {name for _, _, name in pstats.Stats(perfil).stats}
+        assert {"solve_dependencies", "serialize_response", "create_bebida"} <= funciones
+
+    def test_token_incorrecto_no_perfila(self, store):
+        client = TestClient(ProfilingMiddleware(app, store=store, token="secreto"))
+        client.get("/menu", headers={"X-Profile-Token": "otro"})
+        client.get("/menu")
+        assert store.index() == []
+
+    def test_muestreo(self, store):
+        """Test: con tasa 1.0 se perfilan todas las peticiones"""
+        client = TestClient(ProfilingMiddleware(app, store=store, sample_rate=1.0))
+        client.get("/menu")
+        client.post("/menu", json={"name": "Latte", "size": "small", "price": 2.5})
+        assert sorted(p["route"] for p in store.index()) == ["menu", "menu"]
+
+    def test_indice_y_resumen(self, store, monkeypatch):
+        """Test: /debug/profiles lista los perfiles y sirve su resumen"""
+        monkeypatch.setattr("app.debug_routes.profile_store", store)
+        monkeypatch.setattr("app.profiling.PROFILE_TOKEN", "secreto")
+        TestClient(ProfilingMiddleware(app, store=store, sample_rate=1.0)).get("/")
+        debug_app = FastAPI()
+        debug_app.include_router(debug_router)
+        client = TestClient(debug_app, headers={"X-Profile-Token": "secreto"})
+
+        perfiles = client.get("/debug/profiles").json()["profiles"]
+        perfil = next(p for p in perfiles if p["route"] == "root")
+        assert client.get(perfil["summary"]).text.startswith(f"# {perfil['id']}")
+        assert client.get("/debug/profiles/..%2Fetc").status_code == 404
+
+    def test_rutas_debug_exigen_token(self, monkeypatch):
+        """Test: sin el token (o sin PROFILE_TOKEN configurado) se rechaza"""
+        debug_app = FastAPI()
+        debug_app.include_router(debug_router)
+        client = TestClient(debug_app)
+
+        assert client.get("/debug/profiles").status_code == 403
+        monkeypatch.setattr("app.profiling.PROFILE_TOKEN", "secreto")
+        assert client.get("/debug/profiles", headers={"X-Profile-Token": "otro"}).status_code == 403
+
+    def test_rutas_debug_no_montadas_sin_perfilado(self, client):
+        """Test: con PROFILING_ENABLED apagado /debug/profiles no existe"""
+        assert client.get("/debug/profiles").status_code == 404
+
+    def test_un_solo_perfil_activo(self):
+        """Test: un endpoint async intercalado no corta el perfil que ya está activo"""
+        llamadas = []
+
+        @profiled
+        async def endpoint(nombre):
+            llamadas.append(nombre)
+            await asyncio.sleep(0.01)
+            return nombre
+
+        async def run():
+            primero, segundo = RequestProfile(), RequestProfile()
+
+            async def con_perfil(perfil, nombre):
+                active_profile.set(perfil)
+                return await endpoint(nombre)
+
+            resultados = await asyncio.gather(con_perfil(primero, "a"), con_perfil(segundo, "b"))
+            return resultados, primero, segundo
+
+        resultados, primero, segundo = asyncio.run(run())
+        assert resultados == ["a", "b"]
+        assert primero.stats is not None
+        assert segundo.stats is None
@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.debug_routes import slow_queries_router
+from app.main import app
+from app.querylog import QueryLog, query_log
+
+
+class TestQueryLog:
+    """Tests para el registro de consultas lentas"""
+
+    def test_solo_registra_sobre_el_umbral(self, caplog):
+        """Test: las consultas rápidas no se escriben si no hay muestreo"""
+        log = QueryLog(threshold_ms=50, sample_rate=0, top_n=5)
+        with caplog.at_level(logging.INFO, logger="app.querylog"):
+            log.record("SELECT 1", 1.0, "GET /menu")
+            log.record("SELECT  *\n FROM bebidas", 80.0, "GET /menu")
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].levelno == logging.WARNING
+        assert "GET /menu" in caplog.messages[0]
+        assert "SELECT * FROM bebidas" in caplog.messages[0]
+
+    def test_muestreo(self, caplog):
+        log = QueryLog(threshold_ms=50, sample_rate=1.0, top_n=5)
+        with caplog.at_level(logging.INFO, logger="app.querylog"):
+            log.record("SELECT 1", 1.0, None)
+        assert log.sampled_count == 1
+        assert caplog.records[0].levelno == logging.INFO
+
+    def test_top_n_conserva_las_mas_lentas(self):
+        """Test: la tabla acotada descarta la sentencia más rápida"""
+        log = QueryLog(threshold_ms=1000, sample_rate=0, top_n=2)
+        log.record("SELECT a", 5.0, None)
+        log.record("SELECT b", 50.0, "GET /menu")
+        log.record("SELECT c", 20.0, None)
+        log.record("SELECT d", 1.0, None)
+        log.record("SELECT b", 30.0, None)
+
+        slowest = log.slowest()
+        assert [e["statement"] for e in slowest] == ["SELECT b", "SELECT c"]
+        assert slowest[0]["count"] == 2
+        assert slowest[0]["avg_ms"] == 40.0
+        assert slowest[0]["route"] == "GET /menu"
+
+
+    def test_descarta_sin_normalizar_bajo_el_piso(self, monkeypatch):
+        """Test: con la tabla llena, una consulta que no la supera sale antes del lock"""
+        log = QueryLog(threshold_ms=1000, sample_rate=0, top_n=1)
+        log.record("SELECT a", 20.0, None)
+        monkeypatch.setattr(log, "_track", lambda *args: pytest.fail("no debía registrarse"))
+
+        log.record("SELECT b", 5.0, None)
+        log.record("SELECT a", 20.0, None)
+
+        assert log.slowest()[0]["count"] == 1
+
+    def test_usa_la_duracion_de_metrics(self, monkeypatch):
+        """Test: el registro recibe la duración medida por los eventos de metrics"""
+        recibidas = []
+        monkeypatch.setattr(query_log, "record", lambda *args: recibidas.append(args))
+
+        with create_engine("sqlite://").connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert recibidas and recibidas[-1][0] == "SELECT 1"
+        assert recibidas[-1][1] >= 0
+
+
+class TestSlowQueriesEndpoint:
+    """Tests para /debug/slow-queries"""
+
+    def test_no_montada_por_defecto(self, client):
+        assert client.get("/debug/slow-queries").status_code == 404
+
+    def test_asocia_la_ruta(self, monkeypatch):
+        """Test: las consultas de una petición llevan la plantilla de su ruta"""
+        monkeypatch.setattr(query_log, "threshold_ms", 0.0)
+        monkeypatch.setattr("app.profiling.PROFILE_TOKEN", "secreto")
+        query_log.reset()
+        debug_app = FastAPI()
+        debug_app.include_router(slow_queries_router)
+
+        TestClient(app).get("/menu/Latte/small")
+
+        debug_client = TestClient(debug_app, headers={"X-Profile-Token": "secreto"})
+        assert TestClient(debug_app).get("/debug/slow-queries").status_code == 403
+        # No depende del router de perfiles ni de PROFILING_ENABLED
+        assert debug_client.get("/debug/profiles").status_code == 404
+        data = debug_client.get("/debug/slow-queries").json()
+        assert data["threshold_ms"] == 0.0
+        routes = {e["route"] for e in data["statements"]}
+        assert "GET /menu/{name}/{size}" in routes
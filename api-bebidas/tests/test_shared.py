@@ -0,0 +1,134 @@
+import asyncio
+import struct
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from app.cache import MenuCache, MenuSnapshot
+from app.models import BebidaDB
+from app.shared import SEQ_OFFSET, SharedMenuSnapshot
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedMenuSnapshot(str(tmp_path / "menu.shm"))
+
+
+def bebidas(*names):
+    modified = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    return [
+        BebidaDB(id=i, name=name, size="medium", price=3.0, updated_at=modified)
+        for i, name in enumerate(names, start=1)
+    ]
+
+
+class TestSharedMenuSnapshot:
+    """Tests para el menú compartido entre workers"""
+
+    def test_escribir_y_leer(self, shared):
+        """Test: otro proceso lee los mismos bytes, ETag y Last-Modified"""
+        snapshot = MenuSnapshot.from_bebidas(bebidas("Latte", "Mocha") * 20)
+        with shared.lock():
+            shared.write(7, snapshot.etag, snapshot.last_modified, snapshot.body, snapshot.encoded)
+
+        entry = shared.read(7)
+        assert entry.body == snapshot.body
+        assert entry.encoded == snapshot.encoded
+        assert entry.etag == snapshot.etag
+        assert entry.last_modified == snapshot.last_modified
+
+    def test_version_vieja_no_sirve(self, shared):
+        """Test: una copia de otra versión del registro de cambios se ignora"""
+        shared.write(1, '"a"', None, b"[]", {})
+        assert shared.read(2) is None
+        assert shared.read(1).last_modified is None
+        assert shared.stats()["stale"] == 1
+
+    def test_escritura_en_curso_no_se_lee(self, shared):
+        """Test: con el seqlock impar la lectura se descarta"""
+        shared.write(1, '"a"', None, b"[]", {})
+        with open(shared.path, "r+b") as file:
+            file.seek(SEQ_OFFSET)
+            seq = struct.unpack("<Q", file.read(8))[0]
+            file.seek(SEQ_OFFSET)
+            file.write(struct.pack("<Q", seq + 1))
+
+        assert shared.read(1) is None
+        assert shared.stats()["torn"] == 1
+
+    def test_el_archivo_no_se_achica(self, shared):
+        """Test: una versión más chica reutiliza el archivo sin truncarlo"""
+        shared.write(1, '"a"', None, b"x" * 1000, {})
+        shared.write(2, '"b"', None, b"[]", {})
+        assert shared.read(2).body == b"[]"
+
+    def test_archivo_inexistente(self, shared):
+        assert shared.read(1) is None
+
+
+class TestMenuCacheCompartida:
+    """Tests para la caché de menú respaldada por memoria compartida"""
+
+    def test_un_solo_worker_consulta_el_menu(self, shared):
+        """Test: el segundo worker reutiliza el menú publicado por el primero"""
+        cargas = []
+
+        def loader():
+            cargas.append(1)
+            return bebidas("Latte")
+
+        primero, segundo = MenuCache(shared), MenuCache(shared)
+        a = primero.get(loader, lambda: 3)
+        b = segundo.get(loader, lambda: 3)
+
+        assert len(cargas) == 1
+        assert b.body == a.body and b.etag == a.etag
+        assert b.rows == a.rows
+
+    def test_nueva_version_recarga(self, shared):
+        """Test: tras una escritura el menú compartido se reemplaza"""
+        worker = MenuCache(shared)
+        worker.get(lambda: bebidas("Latte"), lambda: 1)
+        worker.invalidate()
+
+        snapshot = worker.get(lambda: bebidas("Latte", "Mocha"), lambda: 2)
+        assert [r["name"] for r in snapshot.rows] == ["Latte", "Mocha"]
+        assert shared.read(1) is None
+        assert shared.read(2).body == snapshot.body
+
+    def test_aget_revisa_la_copia_bajo_el_lock(self, shared):
+        """Test: si otro worker publicó mientras se consultaba, se usa su copia"""
+        otro = MenuCache(shared)
+
+        async def loader():
+            # Otro worker publica la misma versión durante la consulta
+            otro.get(lambda: bebidas("Mocha"), lambda: 5)
+            return bebidas("Latte")
+
+        async def version_loader():
+            return 5
+
+        snapshot = asyncio.run(MenuCache(shared).aget(loader, version_loader))
+
+        assert [r["name"] for r in snapshot.rows] == ["Mocha"]
+        assert shared.read(5).body == snapshot.body
+
+    def test_aget_sin_compartir_serializa_fuera_del_loop(self, monkeypatch):
+        """Test: sin memoria compartida, el JSON y la compresión no bloquean el event loop"""
+        hilos = []
+        original = MenuSnapshot.from_bebidas
+
+        def from_bebidas(rows, changed_at=None):
+            hilos.append(threading.current_thread())
+            return original(rows, changed_at)
+
+        monkeypatch.setattr(MenuSnapshot, "from_bebidas", from_bebidas)
+
+        async def loader():
+            return bebidas("Latte")
+
+        snapshot = asyncio.run(MenuCache().aget(loader))
+
+        assert [r["name"] for r in snapshot.rows] == ["Latte"]
+        assert hilos and hilos[0] is not threading.main_thread()
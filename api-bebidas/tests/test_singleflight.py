@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.cache import MenuCache
+from app.database import Base
+from app.models import BebidaCreate, BebidaDB, BebidaRepository
+from app.singleflight import SingleFlight, repository_flights
+
+
+def esperar(condicion, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condicion()
+
+
+class TestSingleFlight:
+    """Tests para la agrupación de llamadas concurrentes"""
+
+    def test_llamadas_concurrentes_comparten_resultado(self):
+        """Test: mientras la primera llamada sigue en curso, las demás esperan su resultado"""
+        flights = SingleFlight()
+        liberar = threading.Event()
+        ejecuciones = []
+        resultados = []
+
+        def consulta():
+            ejecuciones.append(1)
+            liberar.wait(2)
+            return ["Latte"]
+
+        hilos = [
+            threading.Thread(target=lambda: resultados.append(flights.do("latte", consulta)))
+            for _ in range(5)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        esperar(lambda: flights.stats()["calls"] == 5)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+
+        assert len(ejecuciones) == 1
+        assert sorted(shared for _, shared in resultados) == [False, True, True, True, True]
+        assert flights.stats()["coalesced"] == 4
+        assert flights.stats()["in_flight"] == 0
+
+    def test_error_se_propaga_a_todos(self):
+        """Test: si la consulta falla, quienes esperaban reciben el mismo error"""
+        flights = SingleFlight()
+        liberar = threading.Event()
+        errores = []
+
+        def consulta():
+            liberar.wait(2)
+            raise RuntimeError("sin conexión")
+
+        def llamar():
+            try:
+                flights.do("k", consulta)
+            except RuntimeError as e:
+                errores.append(str(e))
+
+        hilos = [threading.Thread(target=llamar) for _ in range(3)]
+        for hilo in hilos:
+            hilo.start()
+        esperar(lambda: flights.stats()["calls"] == 3)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+        assert errores == ["sin conexión"] * 3
+
+    def test_forget_separa_llamadas_posteriores(self):
+        """Test: tras una escritura no se reutiliza una consulta anterior"""
+        flights = SingleFlight()
+        llamadas = []
+        flights.do("k", lambda: llamadas.append(1))
+        flights.forget()
+        flights.do("k", lambda: llamadas.append(1))
+        assert len(llamadas) == 2
+
+
+class TestMenuCacheAgrupada:
+    """Tests para la reconstrucción del menú tras un fallo de caché"""
+
+    def test_reconstruccion_concurrente_una_sola_carga(self):
+        """Test: los hilos que fallan a la vez comparten el snapshot del primero"""
+        cache = MenuCache()
+        liberar = threading.Event()
+        cargas = []
+        snapshots = []
+
+        def loader():
+            cargas.append(1)
+            liberar.wait(2)
+            return [BebidaDB(id=1, name="Latte", size="small", price=2.5)]
+
+        hilos = [
+            threading.Thread(target=lambda: snapshots.append(cache.get(loader)))
+            for _ in range(4)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        esperar(lambda: cache.stats()["rebuilds"]["calls"] == 4)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+
+        assert len(cargas) == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+    def test_aget_concurrente_una_sola_carga(self):
+        """Test: las corrutinas que fallan a la vez esperan la misma reconstrucción"""
+        cache = MenuCache()
+        cargas = []
+
+        async def loader():
+            cargas.append(1)
+            await asyncio.sleep(0.01)
+            return [BebidaDB(id=1, name="Latte", size="small", price=2.5)]
+
+        async def pedir():
+            return await asyncio.gather(*(cache.aget(loader) for _ in range(4)))
+
+        snapshots = asyncio.run(pedir())
+
+        assert len(cargas) == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'flights.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        BebidaRepository.create(db, BebidaCreate(name="Latte", size="small", price=2.5))
+    yield engine
+    engine.dispose()
+
+
+class TestRepositorioAgrupado:
+    """Tests para las lecturas agrupadas de BebidaRepository"""
+
+    def test_lecturas_concurrentes_una_sola_consulta(self, file_engine):
+        """Test: varias sesiones cuentan el menú y la base recibe una consulta"""
+        liberar = threading.Event()
+        consultas = []
+
+        @event.listens_for(file_engine, "before_cursor_execute")
+        def frenar(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                consultas.append(statement)
+                liberar.wait(2)
+
+        antes = repository_flights.stats()["coalesced"]
+        resultados = []
+
+        def leer():
+            with Session(file_engine) as db:
+                resultados.append(BebidaRepository.count(db))
+
+        hilos = [threading.Thread(target=leer) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        esperar(lambda: repository_flights.stats()["coalesced"] == antes + 3)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+
+        assert len(consultas) == 1
+        assert resultados == [1] * 4
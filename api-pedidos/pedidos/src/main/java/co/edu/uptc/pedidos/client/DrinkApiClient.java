@@ -28,9 +28,13 @@ public class DrinkApiClient {
         }
     }
     
-    public boolean isDrinkAvailable(String name, String size) {
-        Drink drink = getDrinkByName(name);
-        return drink != null && drink.getSize().equals(size);
+    public Drink getDrinkByNameAndSize(String name, String size) {
+        try {
+            String url = drinkApiUrl + "/menu/" + name + "/" + size;
+            return restTemplate.getForObject(url, Drink.class);
+        } catch (HttpClientErrorException.NotFound e) {
+            return null;
+        }
     }
 
 }
@@ -48,18 +48,14 @@ public class OrderService {
                     throw new IllegalArgumentException("El nombre de la bebida es requerido");
                 }
                 
-                Drink drink = drinkApiClient.getDrinkByName(drinkName);
+                // Búsqueda exacta por nombre y tamaño: un 404 cubre ambos casos
+                Drink drink = drinkApiClient.getDrinkByNameAndSize(drinkName, item.getSize());
             
                 if (drink == null) {
                     orderDto.setStatus("REJECTED");
                     orderDto.setTotalPrice(0.0);
-                    throw new IllegalArgumentException("Bebida no disponible en el menú: " + drinkName);
-                }
-                
-                if (!drink.getSize().equals(item.getSize())) {
-                    orderDto.setStatus("REJECTED");
                     throw new IllegalArgumentException(
-                        "La bebida '" + drink.getName() + "' no está disponible en el tamaño '" + item.getSize() + "'"
+                        "Bebida no disponible en el menú: " + drinkName + " en el tamaño '" + item.getSize() + "'"
                     );
                 }
                 
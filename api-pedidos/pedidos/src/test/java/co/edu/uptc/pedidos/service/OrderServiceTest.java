@@ -4,6 +4,8 @@ import static org.junit.jupiter.api.Assertions.assertEquals;
 import static org.junit.jupiter.api.Assertions.assertNotNull;
 import static org.junit.jupiter.api.Assertions.assertThrows;
 import static org.mockito.ArgumentMatchers.any;
+import static org.mockito.ArgumentMatchers.anyString;
+import static org.mockito.Mockito.never;
 import static org.mockito.Mockito.times;
 import static org.mockito.Mockito.verify;
 import static org.mockito.Mockito.when;
@@ -76,7 +78,7 @@ class OrderServiceTest {
         savedOrder.setStatus("CONFIRMED");
         savedOrder.setTotalPrice(3.50);
         
-        when(drinkApiClient.getDrinkByName("Latte")).thenReturn(drink);
+        when(drinkApiClient.getDrinkByNameAndSize("Latte", "medium")).thenReturn(drink);
         when(sequenceGenerator.generateNextOrderId()).thenReturn(1001L);
         when(orderRepo.save(any(Order.class))).thenReturn(savedOrder);
         
@@ -85,7 +87,7 @@ class OrderServiceTest {
         assertNotNull(result.getId());
         assertEquals("CONFIRMED", result.getStatus());
         assertEquals(3.50, result.getTotalPrice());
-        verify(drinkApiClient, times(1)).getDrinkByName("Latte");
+        verify(drinkApiClient, times(1)).getDrinkByNameAndSize("Latte", "medium");
         verify(sequenceGenerator, times(1)).generateNextOrderId();
         verify(orderRepo, times(1)).save(any(Order.class));
     }
@@ -100,19 +102,18 @@ class OrderServiceTest {
         item.setQuantity(1);
         orderDTO.setItems(List.of(item));
         
-        when(drinkApiClient.getDrinkByName("Inexistente")).thenReturn(null);
+        when(drinkApiClient.getDrinkByNameAndSize("Inexistente", "small")).thenReturn(null);
         
         assertThrows(IllegalArgumentException.class, () -> {
             orderService.createOrder(orderDTO);
         });
         
-        verify(drinkApiClient, times(1)).getDrinkByName("Inexistente");
+        verify(drinkApiClient, times(1)).getDrinkByNameAndSize("Inexistente", "small");
     }
     
     @Test
     @DisplayName("Rechazar pedido cuando tamaño no coincide")
     void testCreateOrderWrongSize() {
-        Drink drink = new Drink(1L, "Espresso", "small", 2.00);
         OrderDTO orderDTO = new OrderDTO();
         OrderItem item = new OrderItem();
         item.setDrink(new Drink(1L, "Espresso", "large", 2.00));
@@ -120,18 +121,21 @@ class OrderServiceTest {
         item.setQuantity(1);
         orderDTO.setItems(List.of(item));
         
-        when(drinkApiClient.getDrinkByName("Espresso")).thenReturn(drink);
+        // Espresso solo existe en small, así que la búsqueda exacta en large no encuentra nada
+        when(drinkApiClient.getDrinkByNameAndSize("Espresso", "large")).thenReturn(null);
         
         assertThrows(IllegalArgumentException.class, () -> {
             orderService.createOrder(orderDTO);
         });
+        
+        verify(drinkApiClient, never()).getDrinkByName(anyString());
     }
     
     @Test
     @DisplayName("Obtener todos los pedidos")
     void testGetAllOrders() {
         Drink drink = new Drink(1L, "Americano", "medium", 2.50);
-        when(drinkApiClient.getDrinkByName("Americano")).thenReturn(drink);
+        when(drinkApiClient.getDrinkByNameAndSize("Americano", "medium")).thenReturn(drink);
         when(sequenceGenerator.generateNextOrderId()).thenReturn(1001L, 1002L);
         
         Order savedOrder1 = new Order();
@@ -49,7 +49,7 @@ public class OrderSteps {
     @Given("a drink {string} with size {string} and price {double} exists")
     public void aDrinkExists(String name, String size, Double price) {
         Drink drink = new Drink(1L, name, size, price);
-        when(drinkApiClient.getDrinkByName(name)).thenReturn(drink);
+        when(drinkApiClient.getDrinkByNameAndSize(name, size)).thenReturn(drink);
     }
 
     @When("I create an order for {string} with size {string}")
@@ -63,7 +63,7 @@ public class OrderSteps {
             item.setQuantity(1);
             currentOrder.setItems(List.of(item));
             
-            Drink mockedDrink = drinkApiClient.getDrinkByName(drinkName);
+            Drink mockedDrink = drinkApiClient.getDrinkByNameAndSize(drinkName, size);
             when(sequenceGenerator.generateNextOrderId()).thenReturn(1001L);
             Order savedOrder = new Order();
             savedOrder.setId(1001L);
@@ -4,33 +4,54 @@
 -- Crear extensión para UUID si es necesario
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigramas para búsquedas por subcadena del nombre
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Crear tabla bebidas (será gestionada por Alembic, pero incluimos por seguridad)
 CREATE TABLE IF NOT EXISTS bebidas (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
+    normalized_name VARCHAR(100) NOT NULL,
     size VARCHAR(10) NOT NULL,
     price DECIMAL(10,2) NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Nombre normalizado (minúsculas, espacios colapsados) para bases creadas antes de la columna
+ALTER TABLE bebidas ADD COLUMN IF NOT EXISTS normalized_name VARCHAR(100);
+UPDATE bebidas SET normalized_name = lower(regexp_replace(btrim(name), '\s+', ' ', 'g'))
+WHERE normalized_name IS NULL;
+ALTER TABLE bebidas ALTER COLUMN normalized_name SET NOT NULL;
+
+-- Registro de cambios para la sincronización incremental (GET /menu/changes)
+CREATE TABLE IF NOT EXISTS bebida_cambios (
+    version BIGSERIAL PRIMARY KEY,
+    bebida_id INTEGER NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_bebida_cambios_bebida_id ON bebida_cambios(bebida_id);
+
 -- Crear índices
 CREATE INDEX IF NOT EXISTS idx_bebidas_name ON bebidas(name);
 CREATE INDEX IF NOT EXISTS idx_bebidas_size ON bebidas(size);
 CREATE INDEX IF NOT EXISTS idx_bebidas_price ON bebidas(price);
+CREATE INDEX IF NOT EXISTS idx_bebidas_name_trgm ON bebidas USING gin (normalized_name gin_trgm_ops);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bebida_normalized_name_size ON bebidas(normalized_name, size);
 
 -- Insertar datos de prueba
-INSERT INTO bebidas (name, size, price) VALUES 
-    ('Espresso', 'small', 2.50),
-    ('Americano', 'medium', 3.00),
-    ('Cappuccino', 'large', 4.50),
-    ('Latte', 'medium', 4.00),
-    ('Mocha', 'large', 5.00),
-    ('Macchiato', 'small', 3.50),
-    ('Frappuccino', 'large', 5.50),
-    ('Cold Brew', 'medium', 3.75),
-    ('Espresso con Leche', 'small', 2.75),
-    ('Café Bombón', 'medium', 4.25)
+INSERT INTO bebidas (name, normalized_name, size, price) VALUES 
+    ('Espresso', 'espresso', 'small', 2.50),
+    ('Americano', 'americano', 'medium', 3.00),
+    ('Cappuccino', 'cappuccino', 'large', 4.50),
+    ('Latte', 'latte', 'medium', 4.00),
+    ('Mocha', 'mocha', 'large', 5.00),
+    ('Macchiato', 'macchiato', 'small', 3.50),
+    ('Frappuccino', 'frappuccino', 'large', 5.50),
+    ('Cold Brew', 'cold brew', 'medium', 3.75),
+    ('Espresso con Leche', 'espresso con leche', 'small', 2.75),
+    ('Café Bombón', 'café bombón', 'medium', 4.25)
 ON CONFLICT DO NOTHING;
 
 -- Crear función para actualizar timestamp automáticamente